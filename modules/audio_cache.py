@@ -0,0 +1,175 @@
+"""Cache en disco del audio de cada pista (por video_id), con tope de tamaño y desalojo LRU."""
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional
+
+from modules.cache import default_cache_dir
+from modules.http_client import HttpClient, get_http_client
+from modules.metrics import Metrics
+
+if TYPE_CHECKING:
+    from modules.stream_resolver import ResolvedStream
+
+_CONTENT_RANGE_RE = re.compile(r"bytes \d+-\d+/(\d+)")
+
+
+class AudioCache:
+    """Guarda el stream de audio ya resuelto en `directory` para que los replays sean locales.
+
+    La descarga corre en paralelo a la reproduccion (un archivo a la vez, por rangos como
+    hace yt-dlp para evitar el throttling) y se publica recien al completarse. El uso se
+    marca con el mtime del archivo; al superar max_bytes se borran los menos usados.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        max_bytes: int = 1024 * 1024 * 1024,
+        metrics: Optional[Metrics] = None,
+        http: Optional[HttpClient] = None,
+        chunk_size: int = 1024 * 1024,
+    ) -> None:
+        self.directory = directory or default_cache_dir() / "audio"
+        self.max_bytes = int(max_bytes)
+        self.metrics = metrics or Metrics()
+        self.chunk_size = chunk_size
+        self._http = http or get_http_client()
+        self._lock = threading.Lock()
+        self._inflight: set[str] = set()
+        # Se llama (video_id, archivo) desde el hilo de descarga al completar una pista.
+        self.on_cached: Optional[Callable[[str, Path], None]] = None
+        self._downloads = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio-cache")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for stale in self.directory.glob("*.part"):
+                stale.unlink(missing_ok=True)
+            self._enabled = True
+        except Exception:
+            self._enabled = False
+
+    def _find(self, video_id: str) -> Optional[Path]:
+        if not self._enabled or not video_id:
+            return None
+        for path in self.directory.glob(f"{video_id}.*"):
+            if path.suffix != ".part":
+                return path
+        return None
+
+    def contains(self, video_id: str) -> bool:
+        return self._find(video_id) is not None
+
+    def path_for(self, video_id: str) -> Optional[Path]:
+        """Archivo local de la pista (y lo marca como recien usado) o None."""
+        path = self._find(video_id)
+        if path is None:
+            self.metrics.incr("audio_miss")
+            return None
+        try:
+            os.utime(path)
+        except Exception:
+            pass
+        self.metrics.incr("audio_hit")
+        return path
+
+    def fill(self, stream: "ResolvedStream") -> None:
+        """Descarga el stream en segundo plano si todavia no esta en cache."""
+        video_id = stream.video_id
+        if not self._enabled or not video_id or self._find(video_id) is not None:
+            return
+        with self._lock:
+            if video_id in self._inflight:
+                return
+            self._inflight.add(video_id)
+        self._downloads.submit(self._download, stream)
+
+    def discard(self, video_id: str) -> None:
+        path = self._find(video_id)
+        if path is not None:
+            path.unlink(missing_ok=True)
+
+    def _download(self, stream: "ResolvedStream") -> None:
+        target = self.directory / f"{stream.video_id}.{stream.ext or 'audio'}"
+        part = target.with_name(target.name + ".part")
+        headers = {k: v for k, v in stream.headers.items() if k.lower() != "accept-encoding"}
+        offset = 0
+        try:
+            with self.metrics.time("audio_download"), part.open("wb") as fh:
+                while True:
+                    end = offset + self.chunk_size - 1
+                    resp = self._http.get(
+                        stream.url, timeout=20, headers={**headers, "Range": f"bytes={offset}-{end}"}
+                    )
+                    data = resp.content
+                    fh.write(data)
+                    offset += len(data)
+                    match = _CONTENT_RANGE_RE.match(resp.headers.get("Content-Range", ""))
+                    total = int(match.group(1)) if match else None
+                    if not data or resp.status_code != 206 or (total is not None and offset >= total):
+                        break
+                    if offset > self.max_bytes:
+                        raise RuntimeError("archivo mayor que la cache")
+            part.replace(target)
+            self._evict()
+            if self.on_cached is not None and target.exists():
+                self.on_cached(stream.video_id, target)
+        except Exception:
+            self.metrics.incr("audio_download_error")
+            part.unlink(missing_ok=True)
+        finally:
+            with self._lock:
+                self._inflight.discard(stream.video_id)
+
+    def _entries(self) -> list[tuple[Path, os.stat_result]]:
+        entries = []
+        for path in self.directory.iterdir():
+            if path.suffix == ".part" or not path.is_file():
+                continue
+            try:
+                entries.append((path, path.stat()))
+            except OSError:
+                continue
+        return entries
+
+    def cached_tracks(self) -> dict[str, Path]:
+        """video_id -> archivo de todas las pistas completas en cache."""
+        if not self._enabled:
+            return {}
+        return {path.stem: path for path, _ in self._entries()}
+
+    def _evict(self) -> None:
+        """Borra los archivos menos usados hasta quedar bajo max_bytes."""
+        entries = sorted(self._entries(), key=lambda e: e[1].st_mtime)
+        total = sum(st.st_size for _, st in entries)
+        for path, st in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= st.st_size
+            self.metrics.incr("audio_evictions")
+
+    def size_bytes(self) -> int:
+        if not self._enabled:
+            return 0
+        return sum(st.st_size for _, st in self._entries())
+
+    def stats(self) -> dict[str, float]:
+        hits = self.metrics.count("audio_hit")
+        misses = self.metrics.count("audio_miss")
+        total = hits + misses
+        return {
+            "size_bytes": self.size_bytes(),
+            "max_bytes": self.max_bytes,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": (hits / total) if total else 0.0,
+            "evictions": self.metrics.count("audio_evictions"),
+        }
+
+    def close(self) -> None:
+        self._downloads.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,128 @@
+"""Deteccion de onsets/beats y estimacion de BPM sobre el stream del visualizador."""
+import threading
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+from modules.ringbuffer import RingBuffer
+
+
+class BeatTracker:
+    """Onsets por flujo (espectral o de nivel) con umbral adaptativo, y tempo por autocorrelacion.
+
+    Se alimenta con un cuadro por bloque de audio a frame_rate Hz: update_spectrum() con
+    el vector de bandas (flujo espectral) o update_level() con el nivel en dB (fuente
+    mpv). Un onset es un cuadro cuyo flujo supera media + sensitivity * desvio de la
+    ultima threshold_window y dista al menos min_interval del anterior. Cada ~1 s se
+    reestima el BPM autocorrelacionando los ultimos window segundos de flujo.
+
+    Lo lee la UI desde otro hilo: beat_count / last_beat / bpm / confidence son escalares.
+    Las actualizaciones y reset() (que puede llamar la UI) se serializan con un lock.
+    """
+
+    def __init__(
+        self,
+        frame_rate: float,
+        window: float = 8.0,
+        threshold_window: float = 0.75,
+        sensitivity: float = 1.5,
+        min_interval: float = 0.25,
+        bpm_range: tuple[float, float] = (60.0, 180.0),
+        on_beat: Optional[Callable[[float], None]] = None,
+    ) -> None:
+        self.frame_rate = float(frame_rate)
+        self.sensitivity = sensitivity
+        self.min_interval = min_interval
+        self.bpm_range = bpm_range
+        self.on_beat = on_beat
+        self._flux = RingBuffer(max(16, int(window * frame_rate)))
+        self._threshold_frames = max(4, int(threshold_window * frame_rate))
+        self._tempo_every = max(1, int(frame_rate))
+        self._prev_bands: Optional[np.ndarray] = None
+        self._prev_level: Optional[float] = None
+        self._diff: Optional[np.ndarray] = None
+        self.beat_count = 0
+        self.last_beat = 0.0
+        self.bpm: Optional[float] = None
+        self.confidence = 0.0
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._flux.clear()
+            self._prev_bands = None
+            self._prev_level = None
+            self.last_beat = 0.0
+            self.bpm = None
+            self.confidence = 0.0
+
+    def update_spectrum(self, bands: np.ndarray, now: Optional[float] = None) -> bool:
+        """Flujo espectral: suma de los aumentos por banda respecto del cuadro anterior."""
+        with self._lock:
+            if self._prev_bands is None or len(self._prev_bands) != len(bands):
+                self._prev_bands = bands.astype(np.float32, copy=True)
+                self._diff = np.zeros_like(self._prev_bands)
+                return False
+            np.subtract(bands, self._prev_bands, out=self._diff)
+            np.maximum(self._diff, 0.0, out=self._diff)
+            self._prev_bands[:] = bands
+            return self._push(float(self._diff.sum()), now)
+
+    def update_level(self, level_db: float, now: Optional[float] = None) -> bool:
+        """Flujo de energia (solo aumentos de nivel, en dB) para fuentes sin espectro."""
+        if level_db != level_db or level_db == float("-inf"):
+            level_db = -90.0
+        with self._lock:
+            prev = self._prev_level
+            self._prev_level = level_db
+            if prev is None:
+                return False
+            return self._push(max(0.0, level_db - prev), now)
+
+    def _push(self, flux: float, now: Optional[float]) -> bool:
+        # Llamado con _lock tomado.
+        now = time.monotonic() if now is None else now
+        recent = self._flux.view(self._threshold_frames)
+        onset = False
+        if len(recent) >= self._threshold_frames:
+            threshold = float(recent.mean() + self.sensitivity * recent.std())
+            onset = flux > threshold and flux > 1e-6 and now - self.last_beat >= self.min_interval
+        self._flux.push(flux)
+        if onset:
+            self.beat_count += 1
+            self.last_beat = now
+            if self.on_beat is not None:
+                self.on_beat(now)
+        if self._flux.written % self._tempo_every == 0:
+            self._estimate_tempo()
+        return onset
+
+    def _estimate_tempo(self) -> None:
+        """BPM del pico de autocorrelacion del flujo dentro de bpm_range (ponderado por un prior)."""
+        flux = self._flux.view()
+        if len(flux) < self._flux.capacity // 2:
+            return
+        x = flux - flux.mean()
+        n = len(x)
+        spectrum = np.fft.rfft(x, 2 * n)
+        ac = np.fft.irfft(spectrum * np.conj(spectrum))[:n]
+        if ac[0] <= 0:
+            return
+        low, high = self.bpm_range
+        min_lag = max(1, int(self.frame_rate * 60.0 / high))
+        max_lag = min(n - 2, int(self.frame_rate * 60.0 / low) + 1)
+        if max_lag <= min_lag:
+            return
+        lags = np.arange(min_lag, max_lag + 1)
+        # Suavizar entre lags vecinos (periodos fraccionarios reparten el pico) y aplicar un
+        # prior de tempo (log-normal en torno a 120 BPM) para no caer en la mitad o el doble.
+        score = ac[min_lag : max_lag + 1] + 0.5 * (ac[min_lag - 1 : max_lag] + ac[min_lag + 1 : max_lag + 2])
+        score *= np.exp(-0.5 * np.log2(60.0 * self.frame_rate / lags / 120.0) ** 2)
+        lag = min_lag + int(np.argmax(score))
+        # Interpolacion parabolica para no quedar atado a la resolucion de un cuadro.
+        a, b, c = ac[lag - 1], ac[lag], ac[lag + 1]
+        denom = a - 2 * b + c
+        offset = 0.5 * (a - c) / denom if denom else 0.0
+        self.bpm = round(60.0 * self.frame_rate / (lag + offset), 1)
+        self.confidence = float(max(0.0, min(1.0, b / ac[0])))
@@ -0,0 +1,174 @@
+"""Almacen persistente clave/valor (SQLite) con TTL y desalojo LRU."""
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+
+def default_cache_dir() -> Path:
+    """Directorio de datos de la app (env YTPLAYER_CACHE_DIR o ~/.config/ytplayer)."""
+    env_dir = os.environ.get("YTPLAYER_CACHE_DIR")
+    if env_dir:
+        return Path(env_dir).expanduser()
+    return Path.home() / ".config" / "ytplayer"
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    created: float
+    expires: float
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires
+
+
+class SqliteCache:
+    """Tabla SQLite con expiracion por entrada, limite de tamaño y contadores hit/miss.
+
+    Si la base no puede abrirse (disco de solo lectura, etc.) todas las operaciones
+    se vuelven no-op y la app sigue funcionando sin cache.
+    """
+
+    def __init__(
+        self,
+        table: str,
+        path: Optional[Path] = None,
+        ttl: float = 3600.0,
+        max_entries: int = 1000,
+    ) -> None:
+        if not table.isidentifier():
+            raise ValueError(f"Nombre de tabla invalido: {table}")
+        self.table = table
+        self.path = path or default_cache_dir() / "cache.db"
+        self.ttl = float(ttl)
+        self.max_entries = int(max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created REAL NOT NULL, expires REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table}(accessed)")
+            conn.commit()
+            self._conn = conn
+        except Exception:
+            self._conn = None
+
+    @property
+    def available(self) -> bool:
+        return self._conn is not None
+
+    def get(self, key: str, allow_expired: bool = False) -> Optional[CacheEntry]:
+        """Devuelve la entrada (o None). Con allow_expired tambien devuelve entradas vencidas."""
+        if not self._conn:
+            return None
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    f"SELECT value, created, expires FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                entry = CacheEntry(json.loads(row[0]), float(row[1]), float(row[2]))
+                if entry.expired and not allow_expired:
+                    self.misses += 1
+                    return None
+                self._conn.execute(
+                    f"UPDATE {self.table} SET accessed = ? WHERE key = ?", (time.time(), key)
+                )
+                self._conn.commit()
+            except Exception:
+                return None
+        if entry.expired:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Guarda un valor serializable a JSON y aplica el limite LRU."""
+        if not self._conn:
+            return
+        now = time.time()
+        expires = now + (self.ttl if ttl is None else float(ttl))
+        with self._lock:
+            try:
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, created, expires, accessed) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, json.dumps(value), now, expires, now),
+                )
+                self._evict()
+                self._conn.commit()
+            except Exception:
+                return
+
+    def delete(self, key: str) -> None:
+        if not self._conn:
+            return
+        with self._lock:
+            try:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+            except Exception:
+                return
+
+    def clear(self) -> None:
+        if not self._conn:
+            return
+        with self._lock:
+            try:
+                self._conn.execute(f"DELETE FROM {self.table}")
+                self._conn.commit()
+            except Exception:
+                return
+
+    def __len__(self) -> int:
+        if not self._conn:
+            return 0
+        with self._lock:
+            try:
+                return int(self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0])
+            except Exception:
+                return 0
+
+    def stats(self) -> dict[str, float]:
+        """Contadores de uso (entradas, hits, misses, ratio, desalojos)."""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / total) if total else 0.0,
+            "evictions": self.evictions,
+        }
+
+    def _evict(self) -> None:
+        """Borra las entradas menos usadas recientemente por encima de max_entries (con lock tomado)."""
+        if self.max_entries <= 0:
+            return
+        count = int(self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0])  # type: ignore[union-attr]
+        excess = count - self.max_entries
+        if excess <= 0:
+            return
+        self._conn.execute(  # type: ignore[union-attr]
+            f"DELETE FROM {self.table} WHERE key IN "
+            f"(SELECT key FROM {self.table} ORDER BY accessed ASC LIMIT ?)",
+            (excess,),
+        )
+        self.evictions += excess
@@ -0,0 +1,240 @@
+"""Cache de caratulas en dos niveles: LRU de imagenes decodificadas en memoria y miniaturas en disco."""
+import asyncio
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image as PILImage
+from rich.text import Text
+
+from modules.cache import default_cache_dir
+from modules.cover_render import CoverRenderer
+from modules.metrics import Metrics
+
+
+def square_crop(image: PILImage.Image) -> PILImage.Image:
+    """Recorta la imagen a un cuadrado centrado."""
+    width, height = image.size
+    if width == height:
+        return image
+    side = min(width, height)
+    left = (width - side) // 2
+    top = (height - side) // 2
+    return image.crop((left, top, left + side, top + side))
+
+
+def prepare_cover(data: bytes, size: int = 256, metrics: Optional[Metrics] = None) -> PILImage.Image:
+    """Decodifica, recorta al cuadrado y reduce a size x size (RGB).
+
+    Pensado para correr en un worker; registra cada etapa en metrics
+    ("cover_decode", "cover_crop", "cover_resize").
+    """
+    metrics = metrics or Metrics()
+    start = time.perf_counter()
+    image = PILImage.open(io.BytesIO(data))
+    # JPEG: decodificar directo a una escala reducida (>= 2x el destino).
+    image.draft("RGB", (size * 2, size * 2))
+    image.load()
+    mark = time.perf_counter()
+    metrics.record("cover_decode", mark - start)
+    image = square_crop(image.convert("RGB"))
+    start, mark = mark, time.perf_counter()
+    metrics.record("cover_crop", mark - start)
+    image.thumbnail((size, size))
+    metrics.record("cover_resize", time.perf_counter() - mark)
+    return image
+
+
+def cover_key(video_id: str, url: str) -> str:
+    """Clave de cache: el video_id o, si falta, un hash de la URL."""
+    if video_id:
+        return video_id
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+class CoverCache:
+    """Guarda la caratula ya recortada/reducida para mostrarla sin red ni re-procesar.
+
+    peek() mira solo la memoria (imagen decodificada) y es apto para el event loop;
+    get_async() sigue con el disco (JPEG chico) en el pool de decodificacion y get() hace
+    lo mismo bloqueando. put() guarda en memoria al instante y escribe a disco en un
+    hilo aparte. El disco se limita a max_bytes borrando las menos usadas (mtime).
+
+    Metricas: contadores "cover_hit_memory", "cover_hit_disk", "cover_miss" y
+    "cover_evictions". prepare_async() procesa descargas nuevas en un pool de hilos.
+    render_text_async() arma el fallback en medios bloques (solo cuando textual_image no
+    puede dibujar) en el mismo pool, al tamaño real; renderer los guarda por clave y tamaño.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        max_bytes: int = 64 * 1024 * 1024,
+        memory_items: int = 48,
+        size: int = 256,
+        metrics: Optional[Metrics] = None,
+    ) -> None:
+        self.directory = directory or default_cache_dir() / "covers"
+        self.max_bytes = int(max_bytes)
+        self.memory_items = memory_items
+        self.size = size
+        self.metrics = metrics or Metrics()
+        self.text_cells = (32, 16)
+        self.renderer = CoverRenderer()
+        self._memory: OrderedDict[str, PILImage.Image] = OrderedDict()
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cover-cache")
+        # Decodificacion/recorte/resize fuera del event loop (PIL libera el GIL).
+        self._decoder = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cover-decode")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._enabled = True
+        except Exception:
+            self._enabled = False
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.jpg"
+
+    def peek(self, key: str) -> Optional[PILImage.Image]:
+        """Imagen en memoria, o None (no toca el disco ni cuenta miss)."""
+        with self._lock:
+            image = self._memory.get(key)
+            if image is not None:
+                self._memory.move_to_end(key)
+        if image is not None:
+            self.metrics.incr("cover_hit_memory")
+        return image
+
+    def get(self, key: str) -> Optional[PILImage.Image]:
+        """Imagen lista para mostrar, o None si no esta en ningun nivel (bloqueante)."""
+        image = self.peek(key)
+        return image if image is not None else self._get_disk(key)
+
+    async def get_async(self, key: str) -> Optional[PILImage.Image]:
+        """Como get(), pero la lectura y decodificacion del disco van al pool."""
+        image = self.peek(key)
+        if image is not None:
+            return image
+        return await asyncio.wrap_future(self._decoder.submit(self._get_disk, key))
+
+    def _get_disk(self, key: str) -> Optional[PILImage.Image]:
+        image = self._load_disk(key)
+        if image is None:
+            self.metrics.incr("cover_miss")
+            return None
+        self.metrics.incr("cover_hit_disk")
+        self._remember(key, image)
+        return image
+
+    async def prepare_async(self, data: bytes) -> PILImage.Image:
+        """prepare_cover() en el pool de decodificacion, esperable desde asyncio."""
+        future = self._decoder.submit(prepare_cover, data, self.size, self.metrics)
+        return await asyncio.wrap_future(future)
+
+    async def render_text_async(self, key: str, image: PILImage.Image, cells: tuple[int, int]) -> Text:
+        """Fallback en medios bloques de `cells` (columnas, filas); se arma en el pool si no esta."""
+        text = self.renderer.get(key, cells)
+        if text is not None:
+            return text
+
+        def _render() -> Text:
+            with self.metrics.time("cover_text"):
+                return self.renderer.render(key, image, cells)
+
+        return await asyncio.wrap_future(self._decoder.submit(_render))
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            if key in self._memory:
+                return True
+        return self._enabled and self._path(key).exists()
+
+    def put(self, key: str, image: PILImage.Image) -> None:
+        self._remember(key, image)
+        if self._enabled:
+            self._writer.submit(self._write_disk, key, image)
+
+    def _remember(self, key: str, image: PILImage.Image) -> None:
+        with self._lock:
+            self._memory[key] = image
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _load_disk(self, key: str) -> Optional[PILImage.Image]:
+        if not self._enabled:
+            return None
+        path = self._path(key)
+        try:
+            with PILImage.open(path) as img:
+                image = img.convert("RGB")
+            os.utime(path)
+        except Exception:
+            return None
+        return image
+
+    def _write_disk(self, key: str, image: PILImage.Image) -> None:
+        path = self._path(key)
+        part = path.with_name(path.name + ".part")
+        try:
+            image.save(part, format="JPEG", quality=90)
+            part.replace(path)
+            self._evict()
+        except Exception:
+            part.unlink(missing_ok=True)
+
+    def _entries(self) -> list[tuple[Path, os.stat_result]]:
+        entries = []
+        for path in self.directory.glob("*.jpg"):
+            try:
+                entries.append((path, path.stat()))
+            except OSError:
+                continue
+        return entries
+
+    def _evict(self) -> None:
+        """Borra las caratulas menos usadas hasta quedar bajo max_bytes."""
+        entries = sorted(self._entries(), key=lambda e: e[1].st_mtime)
+        total = sum(st.st_size for _, st in entries)
+        for path, st in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= st.st_size
+            self.metrics.incr("cover_evictions")
+
+    def size_bytes(self) -> int:
+        if not self._enabled:
+            return 0
+        return sum(st.st_size for _, st in self._entries())
+
+    def stats(self) -> dict[str, float]:
+        memory = self.metrics.count("cover_hit_memory")
+        disk = self.metrics.count("cover_hit_disk")
+        misses = self.metrics.count("cover_miss")
+        total = memory + disk + misses
+        with self._lock:
+            memory_entries = len(self._memory)
+        return {
+            "size_bytes": self.size_bytes(),
+            "max_bytes": self.max_bytes,
+            "memory_entries": memory_entries,
+            "hits_memory": memory,
+            "hits_disk": disk,
+            "misses": misses,
+            "hit_ratio": ((memory + disk) / total) if total else 0.0,
+            "evictions": self.metrics.count("cover_evictions"),
+        }
+
+    def close(self) -> None:
+        self._writer.shutdown(wait=False, cancel_futures=True)
+        self._decoder.shutdown(wait=False, cancel_futures=True)
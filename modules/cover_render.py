@@ -0,0 +1,82 @@
+"""Render de caratulas en texto: medios bloques (▀) con color de 24 bits, vectorizado con NumPy."""
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+from PIL import Image as PILImage
+from rich.text import Span, Text
+
+_HEX = np.array([f"{i:02x}" for i in range(256)])
+
+
+def _hex_colors(pixels: np.ndarray) -> np.ndarray:
+    """(..., 3) uint8 -> (...,) strings '#rrggbb'."""
+    out = np.char.add("#", _HEX[pixels[..., 0]])
+    out = np.char.add(out, _HEX[pixels[..., 1]])
+    return np.char.add(out, _HEX[pixels[..., 2]])
+
+
+def fit_cells(size: tuple[int, int], cells: tuple[int, int]) -> tuple[int, int]:
+    """Columnas y filas que entran en `cells` manteniendo el aspecto (cada fila = 2 pixeles)."""
+    width, height = size
+    cols, rows = cells
+    scale = min(cols / width, (rows * 2) / height)
+    return max(1, round(width * scale)), max(1, round(height * scale / 2))
+
+
+def halfblock_text(image: PILImage.Image, cells: tuple[int, int]) -> Text:
+    """Convierte la imagen en celdas ▀ (color = pixel de arriba, fondo = pixel de abajo).
+
+    El resize, el armado de colores y la deteccion de tramos iguales son operaciones
+    de array; solo se crea un Span por tramo de celdas con el mismo estilo.
+    """
+    cols, rows = fit_cells(image.size, cells)
+    resized = image.convert("RGB").resize((cols, rows * 2), PILImage.Resampling.BOX)
+    pixels = np.asarray(resized)
+    styles = np.char.add(np.char.add(_hex_colors(pixels[0::2]), " on "), _hex_colors(pixels[1::2]))
+    line = cols + 1  # celdas + salto de linea
+    # Inicio de cada tramo: primera columna de la fila o cambio de estilo respecto de la anterior.
+    change = np.ones((rows, cols), dtype=bool)
+    change[:, 1:] = styles[:, 1:] != styles[:, :-1]
+    row_idx, col_idx = np.nonzero(change)
+    ends = np.append(col_idx[1:], cols)
+    ends[np.append(row_idx[1:] != row_idx[:-1], True)] = cols
+    starts = row_idx * line + col_idx
+    stops = row_idx * line + ends
+    spans = [
+        Span(int(start), int(stop), str(style))
+        for start, stop, style in zip(starts, stops, styles[row_idx, col_idx])
+    ]
+    plain = "\n".join(["▀" * cols] * rows)
+    return Text(plain, spans=spans, no_wrap=True, overflow="crop")
+
+
+class CoverRenderer:
+    """Cache LRU de renders por (clave de imagen, tamaño en celdas)."""
+
+    def __init__(self, max_items: int = 64) -> None:
+        self.max_items = max_items
+        self._items: OrderedDict[tuple[str, tuple[int, int]], Text] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, cells: tuple[int, int]) -> Optional[Text]:
+        with self._lock:
+            text = self._items.get((key, cells))
+            if text is not None:
+                self._items.move_to_end((key, cells))
+            return text
+
+    def put(self, key: str, cells: tuple[int, int], text: Text) -> None:
+        with self._lock:
+            self._items[(key, cells)] = text
+            self._items.move_to_end((key, cells))
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def render(self, key: str, image: PILImage.Image, cells: tuple[int, int]) -> Text:
+        text = self.get(key, cells)
+        if text is None:
+            text = halfblock_text(image, cells)
+            self.put(key, cells, text)
+        return text
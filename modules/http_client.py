@@ -0,0 +1,132 @@
+"""Clientes HTTP compartidos (requests.Session y aiohttp con pools keep-alive por host)."""
+import asyncio
+import json
+import threading
+from typing import Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import aiohttp  # type: ignore
+except Exception:
+    aiohttp = None
+
+USER_AGENT = "ytplayer/0.1 (https://github.com/MartinAlejandroOviedo/YTPlayer)"
+
+
+class HttpClient:
+    """Sesion unica y thread-safe para todas las llamadas salientes de la app.
+
+    Reutiliza conexiones TCP/TLS por host (keep-alive), acepta gzip, limita la
+    cantidad de requests simultaneos y aplica un timeout uniforme.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 8.0,
+        max_concurrency: int = 8,
+        pool_hosts: int = 16,
+        pool_size: int = 8,
+    ) -> None:
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": USER_AGENT, "Accept-Encoding": "gzip, deflate"})
+        adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrency))
+
+    def get(self, url: str, timeout: Optional[float] = None, **kwargs: Any) -> requests.Response:
+        """GET respetando el limite de concurrencia; lanza HTTPError si el status no es 2xx."""
+        with self._slots:
+            resp = self.session.get(url, timeout=timeout or self.timeout, **kwargs)
+        resp.raise_for_status()
+        return resp
+
+    def get_json(self, url: str, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        return self.get(url, timeout=timeout, **kwargs).json()
+
+    def get_bytes(self, url: str, timeout: Optional[float] = None, **kwargs: Any) -> bytes:
+        return self.get(url, timeout=timeout, **kwargs).content
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class AsyncHttpClient:
+    """Contraparte asyncio de HttpClient.
+
+    Con aiohttp, cancelar la tarea que espera un request cierra el socket en el acto.
+    Sin aiohttp instalado cae al HttpClient sincronico ejecutado en un hilo.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 8.0,
+        max_concurrency: int = 8,
+        pool_size: int = 16,
+        sync_client: Optional[HttpClient] = None,
+    ) -> None:
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._sync = sync_client
+        self._slots = asyncio.Semaphore(max(1, max_concurrency))
+        self._session = None
+
+    @property
+    def native(self) -> bool:
+        return aiohttp is not None
+
+    def _get_session(self):  # type: ignore[no-untyped-def]
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={"User-Agent": USER_AGENT},
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def get_bytes(self, url: str, timeout: Optional[float] = None) -> bytes:
+        """GET asincronico; lanza error si el status no es 2xx."""
+        if aiohttp is None:
+            sync = self._sync or get_http_client()
+            return await asyncio.to_thread(sync.get_bytes, url, timeout or self.timeout)
+        session = self._get_session()
+        async with self._slots:
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout or self.timeout)) as resp:
+                resp.raise_for_status()
+                return await resp.read()
+
+    async def get_json(self, url: str, timeout: Optional[float] = None) -> Any:
+        data = await self.get_bytes(url, timeout=timeout)
+        return json.loads(data.decode("utf-8", "ignore"))
+
+    async def aclose(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+_shared: Optional[HttpClient] = None
+_shared_async: Optional[AsyncHttpClient] = None
+_shared_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """Devuelve la instancia compartida (se crea en el primer uso)."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = HttpClient()
+        return _shared
+
+
+def get_async_http_client() -> AsyncHttpClient:
+    """Devuelve la instancia asyncio compartida (se crea en el primer uso)."""
+    global _shared_async
+    with _shared_lock:
+        if _shared_async is None:
+            _shared_async = AsyncHttpClient()
+        return _shared_async
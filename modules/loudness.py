@@ -0,0 +1,212 @@
+"""Medicion de loudness integrado (EBU R128) por pista y ganancia estatica estilo ReplayGain."""
+import os
+import re
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from modules.cache import SqliteCache
+from modules.metrics import Metrics
+
+if TYPE_CHECKING:
+    from modules.audio_cache import AudioCache
+
+# El resumen de ebur128 es la ultima aparicion de cada valor en stderr.
+_INTEGRATED_RE = re.compile(r"I:\s+(-?\d+(?:\.\d+)?) LUFS")
+_PEAK_RE = re.compile(r"Peak:\s+(-?\d+(?:\.\d+)?|-inf) dBFS")
+
+
+@dataclass
+class LoudnessInfo:
+    lufs: float
+    # True peak en dBFS (None si ffmpeg no lo informo).
+    peak: Optional[float] = None
+
+    def gain(self, target_lufs: float, max_gain: float = 12.0, ceiling: float = -1.0) -> float:
+        """Ganancia (dB) para llevar la pista a target_lufs sin que el pico pase de ceiling."""
+        gain = target_lufs - self.lufs
+        if self.peak is not None:
+            gain = min(gain, ceiling - self.peak)
+        return round(max(-max_gain, min(max_gain, gain)), 2)
+
+
+def measure_loudness(
+    path: str,
+    ffmpeg: str = "ffmpeg",
+    timeout: float = 300.0,
+    running: Optional[set[subprocess.Popen]] = None,
+) -> Optional[LoudnessInfo]:
+    """Decodifica `path` con ffmpeg (filtro ebur128) y devuelve loudness integrado y pico.
+
+    El trabajo lo hace el proceso ffmpeg, asi que alcanza con llamarla desde un hilo.
+    Si se pasa `running`, el proceso queda registrado ahi mientras corre (para matarlo).
+    """
+    cmd = [ffmpeg, "-hide_banner", "-nostats", "-i", path, "-vn", "-af", "ebur128=peak=true", "-f", "null", "-"]
+    try:
+        proc = subprocess.Popen(
+            cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors="ignore"
+        )
+    except Exception:
+        return None
+    if running is not None:
+        running.add(proc)
+    try:
+        _, stderr = proc.communicate(timeout=timeout)
+    except Exception:
+        proc.kill()
+        proc.wait()
+        return None
+    finally:
+        if running is not None:
+            running.discard(proc)
+    integrated = _INTEGRATED_RE.findall(stderr)
+    if proc.returncode != 0 or not integrated:
+        return None
+    lufs = float(integrated[-1])
+    if lufs <= -70.0:
+        # Silencio (o casi): no hay ganancia util que aplicar.
+        return None
+    peaks = _PEAK_RE.findall(stderr)
+    peak = float(peaks[-1]) if peaks and peaks[-1] != "-inf" else None
+    return LoudnessInfo(lufs, peak)
+
+
+class LoudnessAnalyzer:
+    """Mide las pistas del cache de audio y guarda el resultado por video_id.
+
+    analyze() encola una pista recien cacheada en un hilo de fondo; analyze_batch()
+    procesa el atraso del cache completo en un pool de hilos (cada uno espera su ffmpeg).
+    gain_for() devuelve la correccion a aplicar al reproducir (o None si la pista todavia
+    no se analizo). Una medicion fallida se recuerda failure_ttl segundos para no repetir
+    ffmpeg en cada play ni en cada tanda.
+
+    Metricas: tiempo "loudness" por pista y contador "loudness_error".
+    """
+
+    def __init__(
+        self,
+        audio_cache: Optional["AudioCache"] = None,
+        store: Optional[SqliteCache] = None,
+        metrics: Optional[Metrics] = None,
+        target_lufs: float = -14.0,
+        ffmpeg: Optional[str] = None,
+        failure_ttl: float = 7 * 24 * 3600,
+    ) -> None:
+        self.audio_cache = audio_cache
+        self.store = store or SqliteCache("loudness", ttl=365 * 24 * 3600, max_entries=5000)
+        self.metrics = metrics or Metrics()
+        self.target_lufs = target_lufs
+        self.ffmpeg = ffmpeg or shutil.which("ffmpeg")
+        self.failure_ttl = failure_ttl
+        self._lock = threading.Lock()
+        self._inflight: set[str] = set()
+        self._running: set[subprocess.Popen] = set()
+        self._closed = False
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="loudness")
+        self._batch_pool: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def available(self) -> bool:
+        return self.ffmpeg is not None
+
+    def info_for(self, video_id: str) -> Optional[LoudnessInfo]:
+        if not video_id:
+            return None
+        entry = self.store.get(video_id)
+        if entry is None or not isinstance(entry.value, dict) or entry.value.get("failed"):
+            return None
+        try:
+            return LoudnessInfo(**entry.value)
+        except Exception:
+            return None
+
+    def gain_for(self, video_id: str) -> Optional[float]:
+        """Correccion en dB para la pista, o None si no hay medicion."""
+        info = self.info_for(video_id)
+        return info.gain(self.target_lufs) if info else None
+
+    def analyze(self, video_id: str, path: Optional[Path] = None) -> None:
+        """Mide la pista en segundo plano si esta en el cache de audio y no fue medida."""
+        if not self.available or not video_id:
+            return
+        if path is None and self.audio_cache is not None:
+            path = self.audio_cache.cached_tracks().get(video_id)
+        if path is None or self.store.get(video_id) is not None:
+            return
+        with self._lock:
+            if video_id in self._inflight:
+                return
+            self._inflight.add(video_id)
+        self._worker.submit(self._analyze, video_id, path)
+
+    def _analyze(self, video_id: str, path: Path) -> None:
+        try:
+            with self.metrics.time("loudness"):
+                info = measure_loudness(str(path), self.ffmpeg or "ffmpeg", running=self._running)
+            self._store(video_id, info)
+        finally:
+            with self._lock:
+                self._inflight.discard(video_id)
+
+    def _store(self, video_id: str, info: Optional[LoudnessInfo]) -> None:
+        if self._closed:
+            # ffmpeg muerto por close(): no es un resultado.
+            return
+        if info is None:
+            self.metrics.incr("loudness_error")
+            self.store.set(video_id, {"failed": True}, ttl=self.failure_ttl)
+            return
+        self.store.set(video_id, asdict(info))
+
+    def analyze_batch(self, tracks: Optional[dict[str, Path]] = None, workers: Optional[int] = None) -> int:
+        """Mide en paralelo las pistas sin medicion (ni fallo reciente); devuelve cuantas se midieron.
+
+        Sin `tracks` toma todo el cache de audio. Bloqueante: llamar desde un hilo.
+        """
+        if not self.available:
+            return 0
+        if tracks is None:
+            tracks = self.audio_cache.cached_tracks() if self.audio_cache else {}
+        pending = {vid: path for vid, path in tracks.items() if self.store.get(vid) is None}
+        if not pending:
+            return 0
+        workers = workers or max(1, min(len(pending), (os.cpu_count() or 2) - 1))
+        # Hilos: el trabajo lo hace cada proceso ffmpeg, el hilo solo espera su salida.
+        pool = ThreadPoolExecutor(workers, thread_name_prefix="loudness-batch")
+        self._batch_pool = pool
+        done = 0
+        try:
+            with self.metrics.time("loudness_batch"):
+                futures = {
+                    pool.submit(measure_loudness, str(path), self.ffmpeg, running=self._running): vid
+                    for vid, path in pending.items()
+                }
+                for future in as_completed(futures):
+                    try:
+                        info = future.result()
+                    except Exception:
+                        # Cancelado por close() o worker caido.
+                        continue
+                    self._store(futures[future], info)
+                    done += info is not None
+        finally:
+            self._batch_pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+        return done
+
+    def close(self) -> None:
+        self._closed = True
+        self._worker.shutdown(wait=False, cancel_futures=True)
+        pool = self._batch_pool
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        # Los hilos esperan a su ffmpeg: matarlos para no demorar la salida.
+        for proc in list(self._running):
+            try:
+                proc.kill()
+            except Exception:
+                pass
@@ -0,0 +1,136 @@
+"""Proveedores publicos de letras, parsers y cache de resultados (compartido por los clientes)."""
+import re
+from typing import Any, Callable, Optional
+from urllib.parse import quote_plus
+
+from modules.cache import SqliteCache
+
+_SYNCED_LINE_RE = re.compile(r"^\s*\[\d{1,2}:\d{2}", re.MULTILINE)
+
+LyricsProvider = tuple[str, str, Callable[[Any], Optional[str]]]
+
+
+def duration_to_seconds(duration: Optional[str]) -> Optional[int]:
+    """Convierte 'MM:SS' o 'H:MM:SS' a segundos."""
+    if not duration:
+        return None
+    try:
+        parts = [int(p) for p in duration.split(":")]
+        if len(parts) == 2:
+            m, s = parts
+            return m * 60 + s
+        if len(parts) == 3:
+            h, m, s = parts
+            return h * 3600 + m * 60 + s
+    except Exception:
+        return None
+    return None
+
+
+def lrclib_url(title: str, artist: str, album: Optional[str] = None, duration: Optional[str] = None) -> str:
+    """URL de lrclib.net (sin API key, retorna plain/synced lyrics)."""
+    params = [
+        ("track_name", title),
+        ("artist_name", artist),
+        ("album_name", album or ""),
+    ]
+    duration_secs = duration_to_seconds(duration)
+    if duration_secs is not None:
+        params.append(("duration", str(duration_secs)))
+    query = "&".join(f"{k}={quote_plus(v)}" for k, v in params if v)
+    base = "https://lrclib.net/api/get" if duration_secs is not None else "https://lrclib.net/api/search"
+    return f"{base}?{query}"
+
+
+def parse_lrclib(data: Any) -> Optional[str]:
+    record = None
+    if isinstance(data, list) and data:
+        record = data[0]
+    elif isinstance(data, dict) and (data.get("syncedLyrics") or data.get("plainLyrics")):
+        record = data
+    if isinstance(record, dict):
+        return record.get("syncedLyrics") or record.get("plainLyrics") or None
+    return None
+
+
+def parse_lyrics_field(data: Any) -> Optional[str]:
+    if isinstance(data, dict):
+        return data.get("lyrics") or None
+    return None
+
+
+def public_providers(
+    title: str, artist: str, album: Optional[str] = None, duration: Optional[str] = None
+) -> list[LyricsProvider]:
+    """Proveedores publicos como (fuente, url, parser), en orden de preferencia."""
+    return [
+        ("LRCLib", lrclib_url(title, artist, album, duration), parse_lrclib),
+        (
+            "Lyrist API",
+            f"https://lyrist.vercel.app/api/lyrics/{quote_plus(artist)}/{quote_plus(title)}",
+            parse_lyrics_field,
+        ),
+        (
+            "lyrics.ovh",
+            f"https://api.lyrics.ovh/v1/{quote_plus(artist)}/{quote_plus(title)}",
+            parse_lyrics_field,
+        ),
+    ]
+
+
+def lyrics_score(text: str, rank: int) -> tuple[int, int]:
+    """Menor es mejor: primero letras sincronizadas, luego el orden del proveedor."""
+    return (0 if _SYNCED_LINE_RE.search(text) else 1, rank)
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """Un 404 es un "no encontrado" valido; cualquier otro error no debe cachearse."""
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None) or getattr(exc, "status", None)
+    return status != 404
+
+
+class LyricsStore:
+    """Letras cacheadas por video_id y por titulo/artista/duracion, con el proveedor.
+
+    Los "no encontrado" se guardan con miss_ttl; si algun proveedor fallo por red no se
+    guarda nada. Es I/O de SQLite sincronico: desde asyncio llamarlo via to_thread.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[SqliteCache] = None,
+        ttl: float = 30 * 86400,
+        miss_ttl: float = 6 * 3600,
+    ) -> None:
+        self.cache = cache or SqliteCache("lyrics", ttl=ttl, max_entries=5000)
+        self.miss_ttl = miss_ttl
+
+    @staticmethod
+    def video_key(video_id: str) -> str:
+        return f"vid:{video_id}" if video_id else ""
+
+    @staticmethod
+    def public_key(title: str, artist: str, duration: Optional[str]) -> str:
+        def norm(value: Optional[str]) -> str:
+            return " ".join((value or "").lower().split())
+
+        return f"pub:{norm(artist)}|{norm(title)}|{norm(duration)}"
+
+    def get(self, key: str) -> Optional[tuple[Optional[str], str]]:
+        """Devuelve (texto, fuente) si hay entrada vigente; texto None indica "no encontrado"."""
+        if not key:
+            return None
+        entry = self.cache.get(key)
+        if entry is None or not isinstance(entry.value, dict):
+            return None
+        return (entry.value.get("text") or None, entry.value.get("source") or "")
+
+    def store(self, key: str, text: Optional[str], source: str, failed: bool = False) -> None:
+        """Guarda letra o resultado negativo (solo si ningun proveedor fallo por red)."""
+        if not key:
+            return
+        if text:
+            self.cache.set(key, {"text": text, "source": source})
+        elif not failed:
+            self.cache.set(key, {"text": None, "source": ""}, ttl=self.miss_ttl)
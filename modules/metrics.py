@@ -0,0 +1,77 @@
+"""Metricas simples de tiempos y contadores (thread-safe)."""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+
+class Metrics:
+    """Acumula duraciones por nombre (ultima, total, maxima, cantidad) y contadores."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._timings: dict[str, dict[str, float]] = {}
+        self._counters: dict[str, int] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            stat = self._timings.setdefault(name, {"count": 0, "total": 0.0, "last": 0.0, "max": 0.0})
+            stat["count"] += 1
+            stat["total"] += seconds
+            stat["last"] = seconds
+            stat["max"] = max(stat["max"], seconds)
+
+    @contextmanager
+    def time(self, name: str) -> Iterator[None]:
+        """Context manager que registra la duracion del bloque bajo `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def last(self, name: str) -> Optional[float]:
+        with self._lock:
+            stat = self._timings.get(name)
+            return stat["last"] if stat else None
+
+    def mean(self, name: str) -> Optional[float]:
+        with self._lock:
+            stat = self._timings.get(name)
+            return stat["total"] / stat["count"] if stat and stat["count"] else None
+
+    def count(self, name: str) -> int:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> dict[str, dict]:
+        with self._lock:
+            return {
+                "timings": {k: dict(v) for k, v in self._timings.items()},
+                "counters": dict(self._counters),
+            }
+
+    def summary(self, names: Optional[list[str]] = None) -> str:
+        """Texto corto 'nombre 123ms, ...' con la ultima duracion de cada metrica."""
+        with self._lock:
+            keys = names if names is not None else list(self._timings)
+            parts = [f"{k} {self._timings[k]['last'] * 1000:.0f}ms" for k in keys if k in self._timings]
+        return ", ".join(parts)
+
+    def append_report(self, path: Path, **extra: object) -> None:
+        """Agrega una linea JSON con las ultimas duraciones (para comparar entre ejecuciones)."""
+        with self._lock:
+            last = {k: round(v["last"], 4) for k, v in self._timings.items()}
+        record = {"ts": time.time(), **extra, "timings": last}
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("a", encoding="utf-8") as fh:
+                fh.write(json.dumps(record) + "\n")
+        except Exception:
+            return
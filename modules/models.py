@@ -1,4 +1,12 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import List
+
+
+@dataclass
+class Thumbnail:
+    url: str
+    width: int = 0
+    height: int = 0
 
 
 @dataclass
@@ -9,6 +17,12 @@ class SearchResult:
     duration: str
     video_id: str
     thumbnail_url: str
+    # Todas las variantes que ofrece YouTube (ver modules.thumbnails.select_thumbnail).
+    thumbnails: List[Thumbnail] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        # Las filas cacheadas (asdict) traen las variantes como dicts.
+        self.thumbnails = [Thumbnail(**t) if isinstance(t, dict) else t for t in self.thumbnails]
 
     @property
     def url(self) -> str:
@@ -1,35 +1,131 @@
-from typing import Callable, Optional
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Optional
+
+from modules.metrics import Metrics
+
+if TYPE_CHECKING:
+    from modules.audio_cache import AudioCache
+    from modules.stream_resolver import ResolvedStream, StreamResolver
 
 try:
     import mpv  # type: ignore
 except Exception:
     mpv = None
 
+EQ_BANDS_HZ: tuple[int, ...] = (31, 62, 125, 250, 500, 1000, 2000, 4000, 8000, 16000)
+EQ_GAIN_RANGE: tuple[float, float] = (-12.0, 12.0)
+EQ_PRESETS: dict[str, tuple[float, ...]] = {
+    "plano": (0,) * 10,
+    "flat": (0,) * 10,
+    "rock": (5, 4, 2, 0, -2, -2, 0, 2, 4, 5),
+    "pop": (-1, 2, 4, 5, 3, 0, 1, 2, 3, 3),
+    "jazz": (0, 0, 3, 5, 3, 2, 3, 3, 2, 1),
+    "house": (5, 4, 2, 0, -1, 0, 2, 4, 5, 5),
+    "techno": (6, 5, 3, 0, -2, 0, 3, 5, 6, 6),
+}
+# Preset sin ganancias propias: conserva las bandas ajustadas a mano.
+EQ_CUSTOM_PRESET = "personalizado"
+
+
+def eq_preset_gains(preset: Optional[str]) -> list[float]:
+    """Ganancias (dB) de un preset por nombre; lanza ValueError si no existe."""
+    gains = EQ_PRESETS.get((preset or "plano").lower())
+    if gains is None:
+        raise ValueError(f"Preset EQ desconocido: {preset}")
+    return [float(g) for g in gains]
+
+
+def _clamp_gain(gain: float) -> float:
+    low, high = EQ_GAIN_RANGE
+    return round(min(high, max(low, float(gain))), 1)
+
 
 class MPVController:
     """Wrapper sencillo sobre python-mpv."""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        autostart: bool = True,
+        resolver: Optional["StreamResolver"] = None,
+        metrics: Optional[Metrics] = None,
+        audio_cache: Optional["AudioCache"] = None,
+        level_meter: bool = True,
+    ) -> None:
         self._player = None
+        self._resolver = resolver
+        self._audio_cache = audio_cache
+        self.metrics = metrics or Metrics()
+        # (instante del play, camino) hasta que mpv arranca a sonar: metrica play_start_<camino>.
+        self._play_started: Optional[tuple[float, str]] = None
+        # (url original, video_id) cuando se reproduce una URL directa ya resuelta.
+        self._direct_source: Optional[tuple[str, str]] = None
         self._error: Optional[str] = None
         self._last_log: Optional[str] = None
         self._end_callback: Optional[Callable[[], None]] = None
+        self._advance_callback: Optional[Callable[[str], None]] = None
+        # Entrada encolada en el playlist de mpv (gapless): (url original, video_id, es_directa).
+        self._queued: Optional[tuple[str, str, bool]] = None
+        # Snapshot de posicion/duracion/porcentaje alimentado por observers de mpv.
+        self._observing: bool = False
+        self._time_pos: Optional[float] = None
+        self._duration: Optional[float] = None
+        self._percent_pos: Optional[float] = None
         self._normalize_enabled: bool = False
+        # Ganancia de loudness precalculada para la pista actual (None = sin analizar).
+        self._track_gain: Optional[float] = None
         self._eq_preset: str = "plano"
-        if mpv is None:
-            self._error = "libmpv no esta disponible. Instala mpv/libmpv."
+        self._eq_gains: list[float] = [0.0] * len(EQ_BANDS_HZ)
+        # Grafo af persistente: se ajusta con af-command y se reescribe antes de cada archivo.
+        self._graph_ready: bool = False
+        self._graph_supported: bool = True
+        # True si hubo cambios en vivo que el string de af no refleja.
+        self._graph_dirty: bool = False
+        # Ultimo string de af seteado (para no reescribirlo si no cambio).
+        self._graph_chain: str = ""
+        # @norm solo esta en el grafo si la pista arranco con dynaudnorm activo.
+        self._graph_norm: bool = False
+        # Gapless: se cargo la pista encolada (filtros recreados desde af) y falta reenviar los valores.
+        self._resync_pending: bool = False
+        # Filtro astats al final de la cadena para el visualizador (af-metadata/meter).
+        self._level_meter = level_meter
+        self._ready = threading.Event()
+        if autostart:
+            self.start()
+
+    def start(self) -> None:
+        """Crea la instancia de libmpv. Puede tardar: apto para correr en un hilo aparte."""
+        if self._ready.is_set():
             return
         try:
-            # video=False evita abrir ventana; ytdl=True permite URLs de YouTube.
-            self._player = mpv.MPV(
-                ytdl=True,
-                video=False,
-                vo="null",
-                log_handler=self._on_log,
-            )
-            self._register_events()
-        except Exception as exc:  # noqa: BLE001
-            self._error = str(exc)
+            if mpv is None:
+                self._error = "libmpv no esta disponible. Instala mpv/libmpv."
+                return
+            try:
+                # video=False evita abrir ventana; ytdl=True permite URLs de YouTube.
+                # Las URLs de googlevideo ya resueltas se abren directo, sin pasar por yt-dlp.
+                self._player = mpv.MPV(
+                    ytdl=True,
+                    video=False,
+                    vo="null",
+                    log_handler=self._on_log,
+                    script_opts="ytdl_hook-exclude=googlevideo%.com",
+                    prefetch_playlist=True,
+                    gapless_audio="weak",
+                )
+                self._register_events()
+            except Exception as exc:  # noqa: BLE001
+                self._error = str(exc)
+        finally:
+            self._ready.set()
+
+    @property
+    def ready(self) -> bool:
+        """True cuando start() termino (con o sin exito)."""
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
 
     @property
     def available(self) -> bool:
@@ -43,13 +139,133 @@ class MPVController:
     def last_log(self) -> Optional[str]:
         return self._last_log
 
-    def play(self, url: str) -> None:
+    def play(self, url: str, video_id: Optional[str] = None, track_gain: Optional[float] = None) -> None:
+        """Reproduce `url`; prioriza el archivo en cache de audio y luego la URL directa resuelta.
+
+        track_gain es la ganancia de loudness medida para esta pista (None = sin analizar);
+        se fija antes de cargar el archivo para que arranque ya con los filtros correctos.
+        """
         if not self._player:
             raise RuntimeError(self._error or "mpv no inicializado")
         self._last_log = None
-        self._player.play(url)
+        self._queued = None
+        self._reset_time_info()
+        self._track_gain = None if track_gain is None else round(float(track_gain), 2)
+        self._refresh_filter_graph()
+        local = self._audio_cache.path_for(video_id) if self._audio_cache and video_id else None
+        stream = self._resolver.cached(video_id, record=False) if self._resolver and video_id else None
+        if local is not None:
+            self._direct_source = (url, video_id or "")
+            self._play_started = (time.perf_counter(), "local")
+            self._player.play(str(local))
+        elif stream is not None:
+            self._play_direct(stream, url)
+            if self._audio_cache:
+                self._audio_cache.fill(stream)
+        else:
+            # Sin prefetch aca: el hook ytdl de mpv ya extrae este video y otra extraccion
+            # en paralelo lo duplicaria. La app resuelve antes de llamar a play() (con
+            # timeout); si llegamos aca es porque eso fallo o no hay resolver.
+            self._play_ytdl(url)
         self._player.pause = False
 
+    def queue_next(self, url: str, video_id: str) -> None:
+        """Agrega la siguiente pista al playlist de mpv para que empiece sin corte.
+
+        Solo queda en el playlist la pista actual y la encolada; mpv precarga la
+        siguiente (prefetch-playlist) y al terminar la actual se llama al callback
+        de avance en vez del de fin de pista.
+        """
+        if not self._player:
+            raise RuntimeError(self._error or "mpv no inicializado")
+        local = self._audio_cache.path_for(video_id) if self._audio_cache and video_id else None
+        stream = self._resolver.cached(video_id, record=False) if self._resolver and video_id else None
+        self._player.command("playlist-clear")
+        headers: dict[str, str] = {}
+        if local is not None:
+            target = str(local)
+        elif stream is not None:
+            headers = stream.headers
+            target = stream.url
+            if self._audio_cache:
+                self._audio_cache.fill(stream)
+        else:
+            target = url
+        # Headers como opciones de la entrada: los globales siguen siendo los de la pista
+        # actual (reconexiones y seeks de su stream de googlevideo).
+        self._append_entry(target, self._header_options(headers))
+        self._queued = (url, video_id, target != url)
+
+    def clear_queue(self) -> None:
+        """Quita la pista encolada (la actual sigue sonando)."""
+        self._queued = None
+        if self._player:
+            try:
+                self._player.command("playlist-clear")
+            except Exception:
+                pass
+
+    @property
+    def queued_video_id(self) -> Optional[str]:
+        return self._queued[1] if self._queued else None
+
+    def _play_direct(self, stream: "ResolvedStream", original_url: str) -> None:
+        self._direct_source = (original_url, stream.video_id)
+        self._play_started = (time.perf_counter(), "direct")
+        self._set_http_headers(stream.headers)
+        self._player.play(stream.url)  # type: ignore[union-attr]
+
+    def _play_ytdl(self, url: str) -> None:
+        self._direct_source = None
+        self._play_started = (time.perf_counter(), "ytdl")
+        self._set_http_headers({})
+        self._player.play(url)  # type: ignore[union-attr]
+
+    @staticmethod
+    def _header_fields(headers: dict[str, str]) -> list[str]:
+        return [f"{k}: {v}" for k, v in headers.items() if k.lower() != "accept-encoding"]
+
+    def _set_http_headers(self, headers: dict[str, str]) -> None:
+        try:
+            self._player["http-header-fields"] = self._header_fields(headers)  # type: ignore[index]
+        except Exception:
+            pass
+
+    @classmethod
+    def _header_options(cls, headers: dict[str, str]) -> str:
+        """Opciones por archivo de loadfile que reemplazan http-header-fields solo para esa entrada.
+
+        Cada header va con -append y entre %largo% porque los valores pueden tener comas.
+        """
+        options = ["http-header-fields="]
+        for field in cls._header_fields(headers):
+            options.append(f"http-header-fields-append=%{len(field.encode())}%{field}")
+        return ",".join(options)
+
+    def _append_entry(self, target: str, options: str) -> None:
+        try:
+            # mpv >= 0.38: loadfile <url> <flags> <indice> <opciones>.
+            self._player.command("loadfile", target, "append", -1, options)  # type: ignore[union-attr]
+        except Exception:
+            self._player.command("loadfile", target, "append", options)  # type: ignore[union-attr]
+
+    def _fallback_to_ytdl(self) -> bool:
+        """Si fallo una URL directa o el archivo cacheado, invalida ambas caches y reintenta via ytdl."""
+        if not self._direct_source or not self._player:
+            return False
+        original_url, video_id = self._direct_source
+        if self._resolver:
+            self._resolver.invalidate(video_id)
+        if self._audio_cache:
+            self._audio_cache.discard(video_id)
+        self._queued = None
+        try:
+            self._refresh_filter_graph()
+            self._play_ytdl(original_url)
+            return True
+        except Exception:
+            return False
+
     def toggle_pause(self) -> bool:
         if not self._player:
             raise RuntimeError(self._error or "mpv no inicializado")
@@ -99,37 +315,61 @@ class MPVController:
         self._player.command("seek", seconds, "relative")
 
     def get_time_info(self) -> tuple[Optional[float], Optional[float], Optional[float]]:
-        """Devuelve (posicion, duracion, porcentaje)."""
+        """Devuelve (posicion, duracion, porcentaje).
+
+        Con observers registrados lee el snapshot local (sin IPC); si no, consulta a mpv.
+        """
         if not self._player:
             return (None, None, None)
+        if self._observing:
+            pos_f, dur_f, percent_f = self._time_pos, self._duration, self._percent_pos
+        else:
+            pos_f, dur_f, percent_f = self._query_time_info()
+
+        # Si hay duracion y porcentaje pero no posicion, derivarla.
+        if pos_f is None and dur_f is not None and percent_f is not None:
+            pos_f = max(0.0, min(dur_f, dur_f * (percent_f / 100.0)))
+
+        return (pos_f, dur_f, percent_f)
+
+    def _query_time_info(self) -> tuple[Optional[float], Optional[float], Optional[float]]:
         try:
-            pos = self._player.command("get_property", "time-pos")
+            pos = self._player.command("get_property", "time-pos")  # type: ignore[union-attr]
         except Exception:
             try:
                 pos = getattr(self._player, "time_pos", None)
             except Exception:
                 pos = None
         try:
-            dur = self._player.command("get_property", "duration")
+            dur = self._player.command("get_property", "duration")  # type: ignore[union-attr]
         except Exception:
             try:
                 dur = getattr(self._player, "duration", None)
             except Exception:
                 dur = None
         try:
-            percent = self._player.command("get_property", "percent-pos")
+            percent = self._player.command("get_property", "percent-pos")  # type: ignore[union-attr]
         except Exception:
             percent = None
+        return (
+            float(pos) if pos is not None else None,
+            float(dur) if dur is not None else None,
+            float(percent) if percent is not None else None,
+        )
 
-        pos_f = float(pos) if pos is not None else None
-        dur_f = float(dur) if dur is not None else None
-        percent_f = float(percent) if percent is not None else None
+    def _reset_time_info(self) -> None:
+        self._time_pos = None
+        self._duration = None
+        self._percent_pos = None
 
-        # Si hay duracion y porcentaje pero no posicion, derivarla.
-        if pos_f is None and dur_f is not None and percent_f is not None:
-            pos_f = max(0.0, min(dur_f, dur_f * (percent_f / 100.0)))
-
-        return (pos_f, dur_f, percent_f)
+    def _on_time_property(self, name: str, value) -> None:  # type: ignore[no-untyped-def]
+        number = float(value) if isinstance(value, (int, float)) else None
+        if name == "time-pos":
+            self._time_pos = number
+        elif name == "duration":
+            self._duration = number
+        elif name == "percent-pos":
+            self._percent_pos = number
 
     def sample_energy(self) -> float:
         """Devuelve un estimado 0-1 de energia basada en bitrate y volumen."""
@@ -150,79 +390,240 @@ class MPVController:
         level = max(0.0, min(1.0, normalized_br * (0.5 + volume / 2)))
         return level
 
+    @property
+    def has_level_meter(self) -> bool:
+        return self._level_meter and self._player is not None
+
+    def sample_levels(self) -> Optional[tuple[float, float]]:
+        """(RMS, pico) en dBFS del ultimo bloque decodificado, leidos del filtro @meter.
+
+        None si no hay audio sonando o el medidor no esta en la cadena.
+        """
+        if not self._player or not self._level_meter:
+            return None
+        try:
+            meta = self._player.command("get_property", "af-metadata/meter")
+        except Exception:
+            return None
+        if not meta:
+            return None
+        try:
+            rms = float(meta["lavfi.astats.Overall.RMS_level"])
+            peak = float(meta.get("lavfi.astats.Overall.Peak_level", rms))
+        except (KeyError, TypeError, ValueError):
+            return None
+        return rms, peak
+
     def set_normalizer(self, enabled: bool) -> None:
-        """Activa/desactiva normalizacion via dynaudnorm y reaplica filtros activos."""
-        self._normalize_enabled = bool(enabled)
-        self.set_filters(self._normalize_enabled, self._eq_preset)
+        """Activa/desactiva la correccion de loudness (ganancia de la pista o dynaudnorm)."""
+        enabled = bool(enabled)
+        if enabled == self._normalize_enabled and self._graph_ready:
+            return
+        self._normalize_enabled = enabled
+        self._apply_loudness()
+
+    def set_track_gain(self, gain_db: Optional[float]) -> None:
+        """Ganancia estatica (dB) medida para la pista actual; None si no fue analizada.
+
+        Con normalizacion activa, una pista analizada suena con volumen corregido y sin
+        dynaudnorm; las no analizadas siguen usando dynaudnorm.
+        """
+        if not self._player:
+            raise RuntimeError(self._error or "mpv no inicializado")
+        gain = None if gain_db is None else round(float(gain_db), 2)
+        if gain == self._track_gain and self._graph_ready:
+            return
+        self._track_gain = gain
+        self._apply_loudness()
+
+    @property
+    def _dynaudnorm_active(self) -> bool:
+        return self._normalize_enabled and self._track_gain is None
+
+    @property
+    def _static_gain(self) -> float:
+        if self._normalize_enabled and self._track_gain is not None:
+            return self._track_gain
+        return 0.0
+
+    def _apply_loudness(self) -> None:
+        """A mitad de pista: prende/apaga @norm en vivo si esta en el grafo; si hace falta
+        y no esta, se rearma af (solo pasa al activar la normalizacion o en gapless)."""
+        if self._graph_ready:
+            if self._graph_norm:
+                norm_ok = self._apply_live("norm", "enable", "1" if self._dynaudnorm_active else "0")
+            else:
+                norm_ok = not self._dynaudnorm_active
+            if norm_ok and self._apply_live("gain", "volume", f"{self._static_gain:g}dB"):
+                return
+        self._build_filter_graph()
 
     def set_equalizer_preset(self, preset: str) -> None:
-        """Configura ecualizador a partir de un nombre de preset y reaplica filtros."""
+        """Configura ecualizador a partir de un nombre de preset ("personalizado" conserva las bandas)."""
         self._eq_preset = preset
-        self.set_filters(self._normalize_enabled, self._eq_preset)
+        if preset.lower() == EQ_CUSTOM_PRESET:
+            return
+        self.set_eq_gains(eq_preset_gains(preset))
+
+    def set_eq_gains(self, gains: list[float]) -> None:
+        """Aplica una ganancia (dB) por banda de EQ_BANDS_HZ, en vivo sobre el grafo ya armado."""
+        if len(gains) != len(EQ_BANDS_HZ):
+            raise ValueError(f"Se esperaban {len(EQ_BANDS_HZ)} ganancias de EQ")
+        if not self._graph_ready:
+            self._eq_gains = [_clamp_gain(g) for g in gains]
+            self._build_filter_graph()
+            return
+        for index, gain in enumerate(gains):
+            self.set_band_gain(index, gain)
 
-    def set_filters(self, normalize: bool, eq_preset: Optional[str]) -> None:
-        """Aplica cadena de filtros (normalizador + ecualizador)."""
+    def set_band_gain(self, index: int, gain: float) -> None:
+        """Cambia la ganancia de una banda; si af-command no anda se rearma la cadena."""
         if not self._player:
             raise RuntimeError(self._error or "mpv no inicializado")
+        gain = _clamp_gain(gain)
+        if self._eq_gains[index] == gain and self._graph_ready:
+            return
+        self._eq_gains[index] = gain
+        if self._graph_ready and self._apply_live(f"eq{index}", "g", f"{gain:g}"):
+            return
+        self._build_filter_graph()
+
+    @property
+    def eq_gains(self) -> list[float]:
+        return list(self._eq_gains)
 
-        # Construir filtro de ecualizador segun preset
-        eq_filter = self._build_eq_filter(eq_preset)
-        self._normalize_enabled = bool(normalize)
+    def set_filters(
+        self, normalize: bool, eq_preset: Optional[str], gains: Optional[list[float]] = None
+    ) -> None:
+        """Aplica normalizador + ecualizador (preset o `gains` por banda); arma la cadena la primera vez."""
+        if not self._player:
+            raise RuntimeError(self._error or "mpv no inicializado")
         self._eq_preset = eq_preset or "plano"
+        if gains is None:
+            custom = self._eq_preset.lower() == EQ_CUSTOM_PRESET
+            gains = self._eq_gains if custom else eq_preset_gains(self._eq_preset)
+        if not self._graph_ready:
+            self._normalize_enabled = bool(normalize)
+            self._eq_gains = [_clamp_gain(g) for g in gains]
+            self._build_filter_graph()
+            return
+        self.set_normalizer(normalize)
+        self.set_eq_gains(gains)
 
-        normalizer_candidates = ["dynaudnorm", "lavfi=[dynaudnorm]"] if normalize else [None]
-        errors: list[str] = []
+    def _filter_chain(self, in_place: bool) -> str:
+        """Cadena af con etiquetas: @norm (dynaudnorm), @gain (ganancia de la pista) y
+        @eq0..@eq9 (una banda cada una).
 
-        for norm in normalizer_candidates:
-            filters: list[str] = []
-            if norm:
-                filters.append(norm)
-            if eq_filter:
-                filters.append(eq_filter)
-            # Si no hay filtros activos, limpiar af y salir.
-            if not filters:
-                try:
-                    self._player.command("set_property", "af", "")
-                    return
-                except Exception as exc:  # noqa: BLE001
-                    errors.append(str(exc))
-                    continue
+        @norm solo entra si la pista no fue analizada y la normalizacion esta activa:
+        apagado, dynaudnorm igual retiene su cola de frames. Con in_place la ganancia y
+        las bandas se incluyen aunque esten en 0 dB, para poder cambiarlas despues sin
+        volver a setear af.
+        """
+        filters: list[str] = []
+        if self._dynaudnorm_active:
+            filters.append("@norm:dynaudnorm")
+        if in_place or self._static_gain != 0:
+            filters.append(f"@gain:lavfi-volume=volume={self._static_gain:g}dB")
+        for index, (freq, gain) in enumerate(zip(EQ_BANDS_HZ, self._eq_gains)):
+            if in_place or gain != 0:
+                filters.append(f"@eq{index}:equalizer=f={freq}:width_type=q:width=1:g={gain:g}")
+        if self._level_meter:
+            # Medidor al final: niveles de lo que realmente suena (ver sample_levels).
+            filters.append("@meter:lavfi=[astats=metadata=1:reset=1]")
+        return ",".join(filters)
+
+    def _build_filter_graph(self) -> None:
+        """Setea af completo (reinicia el grafo) con los valores actuales.
+
+        Al inicio, antes de cargar un archivo si hubo cambios en vivo, o si af-command no
+        esta soportado.
+        """
+        if not self._player:
+            raise RuntimeError(self._error or "mpv no inicializado")
+        errors: list[str] = []
+        if self._graph_supported:
             try:
-                self._player.command("set_property", "af", ",".join(filters))
+                chain = self._filter_chain(in_place=True)
+                self._player.command("set_property", "af", chain)
+                self._graph_chain = chain
+                self._graph_norm = self._dynaudnorm_active
+                self._graph_ready = True
+                self._graph_dirty = False
                 return
             except Exception as exc:  # noqa: BLE001
                 errors.append(str(exc))
-                continue
-
+                self._graph_supported = False
+        # Sin af-command: cadena minima, cada cambio vuelve a setear af.
+        self._graph_ready = False
+        try:
+            self._player.command("set_property", "af", self._filter_chain(in_place=False))
+            return
+        except Exception as exc:  # noqa: BLE001
+            errors.append(str(exc))
+        if self._level_meter:
+            # ffmpeg sin astats: reintentar sin el medidor.
+            self._level_meter = False
+            self._graph_supported = len(errors) > 1
+            self._build_filter_graph()
+            return
         raise RuntimeError(f"af error: {'; '.join(errors)}")
 
-    def _build_eq_filter(self, preset: Optional[str]) -> str:
-        """Devuelve cadena de filtro equalizer para mpv o vacio si es plano."""
-        if not preset:
-            return ""
-        name = preset.lower()
-        bands_hz = [31, 62, 125, 250, 500, 1000, 2000, 4000, 8000, 16000]
-        presets: dict[str, list[int]] = {
-            "plano": [0] * 10,
-            "flat": [0] * 10,
-            "rock": [5, 4, 2, 0, -2, -2, 0, 2, 4, 5],
-            "pop": [-1, 2, 4, 5, 3, 0, 1, 2, 3, 3],
-            "jazz": [0, 0, 3, 5, 3, 2, 3, 3, 2, 1],
-            "house": [5, 4, 2, 0, -1, 0, 2, 4, 5, 5],
-            "techno": [6, 5, 3, 0, -2, 0, 3, 5, 6, 6],
-        }
-        gains = presets.get(name)
-        if gains is None:
-            raise ValueError(f"Preset EQ desconocido: {preset}")
-        # Si todas las ganancias son 0, no aplicar filtro.
-        if all(g == 0 for g in gains):
-            return ""
-        parts = [
-            f"equalizer=f={freq}:width_type=q:width=1:g={gain}"
-            for freq, gain in zip(bands_hz, gains, strict=False)
-            if gain != 0
-        ]
-        return ",".join(parts)
+    def _apply_live(self, label: str, command: str, argument: str) -> bool:
+        """Envia el cambio al filtro etiquetado; False si mpv/ffmpeg no soporta el comando."""
+        if self._send_filter_command(label, command, argument):
+            self._graph_dirty = True
+            return True
+        if not self._audio_active():
+            # Sin audio no hay filtros instanciados: se aplica al arrancar la pista.
+            self._graph_dirty = True
+            return True
+        self._graph_supported = False
+        self._graph_ready = False
+        return False
+
+    def _send_filter_command(self, label: str, command: str, argument: str) -> bool:
+        try:
+            self._player.command("af-command", label, command, argument)  # type: ignore[union-attr]
+            return True
+        except Exception:
+            return False
+
+    def _audio_active(self) -> bool:
+        try:
+            return bool(self._player.audio_params)  # type: ignore[union-attr]
+        except Exception:
+            return False
+
+    def _refresh_filter_graph(self) -> None:
+        """Antes de cargar un archivo: reescribe af si tiene valores viejos.
+
+        mpv recrea los filtros desde af en cada archivo; sin esto la pista arrancaria con
+        la ganancia/EQ del string original hasta el reenvio. Sin audio cargado no hay corte.
+        """
+        if not self._graph_ready:
+            return
+        if self._graph_dirty or self._filter_chain(in_place=True) != self._graph_chain:
+            self._build_filter_graph()
+
+    def _resync_filter_graph(self) -> None:
+        """Gapless: reaplica los valores cambiados en vivo a la pista encolada.
+
+        La pista encolada se carga desde af sin pasar por play(). Solo una vez por archivo
+        (file-loaded marca _resync_pending), no en cada seek; el pendiente se limpia
+        cuando todos los comandos entraron.
+        """
+        if not self._resync_pending:
+            return
+        if not self._graph_ready or not self._graph_dirty:
+            self._resync_pending = False
+            return
+        ok = self._send_filter_command("gain", "volume", f"{self._static_gain:g}dB")
+        if self._graph_norm:
+            ok = self._send_filter_command("norm", "enable", "1" if self._dynaudnorm_active else "0") and ok
+        for index, gain in enumerate(self._eq_gains):
+            ok = self._send_filter_command(f"eq{index}", "g", f"{gain:g}") and ok
+        if ok:
+            self._resync_pending = False
 
     def _on_log(self, level: str, prefix: str, text: str) -> None:
         if level.lower() in {"error", "warning"}:
@@ -232,18 +633,72 @@ class MPVController:
         """Registra un callback para fin de pista (no en errores)."""
         self._end_callback = callback
 
+    def set_advance_callback(self, callback: Callable[[str], None]) -> None:
+        """Registra un callback (video_id) para cuando mpv pasa a la pista encolada."""
+        self._advance_callback = callback
+
+    @staticmethod
+    def _end_file_info(event) -> tuple[Optional[str], Optional[int]]:  # type: ignore[no-untyped-def]
+        """Extrae (reason, error) del evento end-file en sus distintas formas segun la version."""
+        data = getattr(event, "data", None) or event
+        if isinstance(data, dict) and isinstance(data.get("event"), dict):
+            data = data["event"]
+        if isinstance(data, dict):
+            reason, error = data.get("reason"), data.get("error")
+        else:
+            reason, error = getattr(data, "reason", None), getattr(data, "error", None)
+        names = {0: "eof", 2: "stop", 3: "quit", 4: "error", 5: "redirect"}
+        if isinstance(reason, int):
+            reason = names.get(reason, str(reason))
+        elif isinstance(reason, bytes):
+            reason = reason.decode()
+        return (reason.lower() if isinstance(reason, str) else None, error)
+
     def _register_events(self) -> None:
         if not self._player:
             return
+        try:
+            for prop in ("time-pos", "duration", "percent-pos"):
+                self._player.observe_property(prop, self._on_time_property)
+            self._observing = True
+        except Exception:
+            self._observing = False
+
+        @self._player.event_callback("file-loaded")
+        def _file_loaded(event):  # type: ignore
+            self._resync_pending = True
+
+        @self._player.event_callback("playback-restart")
+        def _playback_restart(event):  # type: ignore
+            self._resync_filter_graph()
+            started = self._play_started
+            if started:
+                self._play_started = None
+                self.metrics.record(f"play_start_{started[1]}", time.perf_counter() - started[0])
 
         @self._player.event_callback("end-file")
         def _end_file(event):  # type: ignore
             # reason 'error' or error code set.
-            reason = getattr(event, "reason", None)
-            error = getattr(event, "error", None)
+            reason, error = self._end_file_info(event)
             if reason == "error" or error not in (0, None):
+                if self._fallback_to_ytdl():
+                    return
                 self._last_log = f"end-file error: reason={reason}, code={error}"
                 return
+            if reason not in (None, "eof"):
+                # stop/quit/redirect: reemplazo manual de pista, no es fin natural.
+                return
+            queued = self._queued
+            if queued is not None:
+                self._queued = None
+                original_url, video_id, direct = queued
+                self._direct_source = (original_url, video_id) if direct else None
+                if self._advance_callback:
+                    try:
+                        self._advance_callback(video_id)
+                    except Exception:
+                        pass
+                return
             if self._end_callback:
                 try:
                     self._end_callback()
@@ -0,0 +1,73 @@
+"""Buffer circular de tamaño fijo sobre un array NumPy, sin locks y sin copias al leer."""
+from typing import Optional
+
+import numpy as np
+
+
+class RingBuffer:
+    """Buffer circular con los datos espejados (2 x capacity) para leer vistas contiguas.
+
+    Cada elemento se escribe en i e i + capacity, asi las ultimas n muestras siempre
+    forman un slice contiguo: view() devuelve una vista, sin copiar ni alocar.
+
+    Pensado para un productor y un consumidor sin locks: el productor escribe y despues
+    avanza `written`; el consumidor lee `written`, toma view(n, at=written) y, si
+    necesita consistencia, verifica con overwritten() que no lo hayan pisado mientras
+    copiaba.
+    """
+
+    def __init__(self, capacity: int, shape: tuple[int, ...] = (), dtype: type = np.float32) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity debe ser positiva")
+        self.capacity = int(capacity)
+        self._data = np.zeros((2 * self.capacity, *shape), dtype=dtype)
+        # Total historico de elementos escritos (solo lo modifica el productor).
+        self.written = 0
+
+    def __len__(self) -> int:
+        return min(self.written, self.capacity)
+
+    def push(self, value: float) -> None:
+        """Agrega un elemento (O(1))."""
+        i = self.written % self.capacity
+        self._data[i] = value
+        self._data[i + self.capacity] = value
+        self.written += 1
+
+    def extend(self, block: np.ndarray) -> None:
+        """Agrega un bloque de elementos; si es mas largo que el buffer quedan los ultimos."""
+        n = len(block)
+        if n == 0:
+            return
+        if n > self.capacity:
+            self.written += n - self.capacity
+            block = block[-self.capacity :]
+            n = self.capacity
+        cap = self.capacity
+        i = self.written % cap
+        first = min(n, cap - i)
+        self._data[i : i + first] = block[:first]
+        self._data[i + cap : i + cap + first] = block[:first]
+        rest = n - first
+        if rest:
+            self._data[:rest] = block[first:]
+            self._data[cap : cap + rest] = block[first:]
+        self.written += n
+
+    def view(self, n: Optional[int] = None, at: Optional[int] = None) -> np.ndarray:
+        """Vista (sin copia) de los ultimos n elementos escritos hasta `at` (default: ahora)."""
+        at = self.written if at is None else at
+        available = min(at, self.capacity)
+        n = available if n is None else min(n, available)
+        end = at % self.capacity + self.capacity
+        return self._data[end - n : end]
+
+    def overwritten(self, n: int, at: int, margin: int = 0) -> bool:
+        """True si los n elementos que terminaban en `at` pudieron ser pisados por el productor.
+
+        `margin` cubre una escritura en curso (p.ej. el tamaño de bloque del productor).
+        """
+        return self.written + margin - at + n > self.capacity
+
+    def clear(self) -> None:
+        self.written = 0
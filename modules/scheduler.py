@@ -0,0 +1,78 @@
+"""Planificador unico para el trabajo periodico de la UI (ritmo adaptativo con presupuesto)."""
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from modules.metrics import Metrics
+
+
+@dataclass
+class RefreshJob:
+    name: str
+    callback: Callable[[], None]
+    # Intervalo deseado segun el estado de la app; None = no correr.
+    interval: Callable[[], Optional[float]]
+    # Fraccion del intervalo que puede tardar el callback antes de espaciarlo.
+    budget: float = 0.25
+    backoff: float = 1.0
+    next_due: Optional[float] = None
+
+
+class RefreshScheduler:
+    """Corre los jobs vencidos en cada tick() y dice cuando hace falta el proximo.
+
+    Cada job pide su intervalo en cada tick, asi el ritmo sigue al estado (visible,
+    reproduciendo, foco). Si un job tarda mas que budget * intervalo se espacia
+    (backoff x1.5 hasta max_backoff) y vuelve de a poco a su ritmo cuando alcanza.
+
+    Metricas: tiempo "refresh_<job>" y contador "refresh_backoff".
+    """
+
+    def __init__(self, metrics: Optional[Metrics] = None, max_backoff: float = 8.0) -> None:
+        self.metrics = metrics or Metrics()
+        self.max_backoff = max_backoff
+        self._jobs: list[RefreshJob] = []
+
+    def add(
+        self,
+        name: str,
+        callback: Callable[[], None],
+        interval: Callable[[], Optional[float]],
+        budget: float = 0.25,
+    ) -> RefreshJob:
+        job = RefreshJob(name, callback, interval, budget)
+        self._jobs.append(job)
+        return job
+
+    def tick(self, now: Optional[float] = None) -> Optional[float]:
+        """Corre los jobs vencidos; devuelve segundos hasta el proximo (None = nada activo)."""
+        now = time.monotonic() if now is None else now
+        delay: Optional[float] = None
+        for job in self._jobs:
+            interval = job.interval()
+            if not interval:
+                job.next_due = None
+                job.backoff = 1.0
+                continue
+            if job.next_due is None or now >= job.next_due:
+                self._run(job, interval)
+                job.next_due = now + interval * job.backoff
+            wait = max(0.0, job.next_due - now)
+            delay = wait if delay is None else min(delay, wait)
+        return delay
+
+    def _run(self, job: RefreshJob, interval: float) -> None:
+        start = time.perf_counter()
+        try:
+            job.callback()
+        finally:
+            cost = time.perf_counter() - start
+            self.metrics.record(f"refresh_{job.name}", cost)
+            if cost > job.budget * interval * job.backoff:
+                job.backoff = min(self.max_backoff, job.backoff * 1.5)
+                self.metrics.incr("refresh_backoff")
+            elif job.backoff > 1.0:
+                job.backoff = max(1.0, job.backoff * 0.9)
+
+    def backoff(self, name: str) -> float:
+        return next((job.backoff for job in self._jobs if job.name == name), 1.0)
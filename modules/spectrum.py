@@ -0,0 +1,93 @@
+"""Analizador de espectro por bandas logaritmicas con buffers preasignados."""
+import time
+
+import numpy as np
+
+
+class SpectrumAnalyzer:
+    """Convierte bloques de audio en un vector de bandas 0-1 (escala dB, bandas log).
+
+    Ventana Hann, buffers de trabajo y bordes de banda se calculan una vez; por bloque
+    solo se aloca la salida compleja de np.fft.rfft. Las bandas suben al instante y
+    bajan suavizadas (smoothing); los picos caen peak_decay por bloque.
+    """
+
+    def __init__(
+        self,
+        samplerate: int = 44100,
+        frames: int = 1024,
+        bands: int = 32,
+        fmin: float = 40.0,
+        fmax: float = 16000.0,
+        smoothing: float = 0.6,
+        peak_decay: float = 0.015,
+        floor_db: float = -70.0,
+    ) -> None:
+        self.samplerate = samplerate
+        self.frames = frames
+        self.smoothing = smoothing
+        self.peak_decay = peak_decay
+        self.floor_db = floor_db
+        self._window = np.hanning(frames).astype(np.float32)
+        # Un seno a escala completa da |X| = sum(w) / 2 en su bin: referencia de 0 dBFS.
+        self._ref_power = float((self._window.sum() / 2.0) ** 2)
+        self._mono = np.zeros(frames, dtype=np.float32)
+        self._power = np.zeros(frames // 2 + 1, dtype=np.float32)
+        self._starts, self._widths = self._band_bins(bands, fmin, min(fmax, samplerate / 2))
+        self._stop = int(self._starts[-1] + self._widths[-1])
+        self._raw = np.zeros(len(self._starts), dtype=np.float32)
+        self.bands = np.zeros(len(self._starts), dtype=np.float32)
+        self.peaks = np.zeros(len(self._starts), dtype=np.float32)
+        self.level = 0.0
+        self.process_time = 0.0
+
+    def _band_bins(self, bands: int, fmin: float, fmax: float) -> tuple[np.ndarray, np.ndarray]:
+        """Primer bin y cantidad de bins de cada banda (al menos uno por banda)."""
+        hz_per_bin = self.samplerate / self.frames
+        edges = np.round(np.geomspace(fmin, fmax, bands + 1) / hz_per_bin).astype(np.int64)
+        edges[0] = max(1, edges[0])
+        for i in range(1, len(edges)):
+            edges[i] = max(edges[i], edges[i - 1] + 1)
+        edges = edges[edges <= self.frames // 2 + 1]
+        return edges[:-1], np.diff(edges).astype(np.float32)
+
+    @property
+    def band_count(self) -> int:
+        return len(self.bands)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Analiza un bloque (frames x canales o mono) y devuelve el vector de bandas."""
+        start = time.perf_counter()
+        n = min(len(block), self.frames)
+        if block.ndim == 2:
+            np.mean(block[:n], axis=1, out=self._mono[:n])
+        else:
+            self._mono[:n] = block[:n]
+        if n < self.frames:
+            self._mono[n:] = 0.0
+        self._mono *= self._window
+        spectrum = np.fft.rfft(self._mono)
+        np.abs(spectrum, out=self._power)
+        np.square(self._power, out=self._power)
+        # Potencia media por banda -> dBFS -> 0..1
+        np.add.reduceat(self._power[: self._stop], self._starts, out=self._raw)
+        self._raw /= self._widths
+        self._raw /= self._ref_power
+        np.maximum(self._raw, 1e-12, out=self._raw)
+        np.log10(self._raw, out=self._raw)
+        self._raw *= 10.0 / -self.floor_db
+        self._raw += 1.0
+        np.clip(self._raw, 0.0, 1.0, out=self._raw)
+        # Ataque instantaneo, caida suavizada.
+        self.bands *= self.smoothing
+        np.maximum(self.bands, self._raw, out=self.bands)
+        self.peaks -= self.peak_decay
+        np.maximum(self.peaks, self.bands, out=self.peaks)
+        self.level = float(self.bands.mean())
+        self.process_time = time.perf_counter() - start
+        return self.bands
+
+    def reset(self) -> None:
+        self.bands.fill(0.0)
+        self.peaks.fill(0.0)
+        self.level = 0.0
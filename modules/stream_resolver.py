@@ -0,0 +1,266 @@
+"""Resolucion de URLs directas de audio (yt-dlp) con cache en memoria y disco."""
+import asyncio
+import importlib.util
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from functools import partial
+from typing import Any, Optional
+
+from modules.cache import SqliteCache
+from modules.metrics import Metrics
+
+# yt_dlp tarda en importarse: se carga recien en el primer worker (ver _get_ydl).
+yt_dlp: Any = None
+_YT_DLP_FOUND = importlib.util.find_spec("yt_dlp") is not None
+
+_EXPIRE_RE = re.compile(r"[?&/]expire[=/](\d+)")
+
+
+@dataclass
+class ResolvedStream:
+    video_id: str
+    url: str
+    expires: float
+    headers: dict[str, str] = field(default_factory=dict)
+    ext: str = ""
+
+    def valid(self, margin: float = 120.0) -> bool:
+        """True si la URL sigue vigente con `margin` segundos de holgura."""
+        return time.time() + margin < self.expires
+
+
+class StreamResolver:
+    """Obtiene la URL de audio de un video_id y la cachea hasta su expiracion.
+
+    Las extracciones corren en hilos que mantienen su propio YoutubeDL (con el extractor
+    de YouTube ya inicializado) entre plays, asi que solo la primera de cada hilo paga el
+    arranque. resolve_async() (el play del usuario) tiene workers propios; prefetch()
+    usa un pool aparte, asi un click nunca queda en cola detras de precargas. Una
+    extraccion en curso del mismo video_id se comparte, y un play que fue reemplazado
+    por otro antes de arrancar se descarta. warm_up() inicializa un worker de play al
+    inicio. Un video_id que fallo no se vuelve a precargar hasta pasados retry_after
+    segundos.
+
+    Metricas: tiempo "resolve" por extraccion y contadores "stream_hit" / "stream_miss".
+    """
+
+    def __init__(
+        self,
+        cache: Optional[SqliteCache] = None,
+        metrics: Optional[Metrics] = None,
+        audio_format: str = "bestaudio[acodec=opus]/bestaudio/best",
+        default_lifetime: float = 5 * 3600,
+        workers: int = 2,
+        play_workers: int = 2,
+        retry_after: float = 300.0,
+    ) -> None:
+        self.cache = cache or SqliteCache("streams", max_entries=500)
+        self.metrics = metrics or Metrics()
+        self.audio_format = audio_format
+        self.default_lifetime = default_lifetime
+        self._memory: dict[str, ResolvedStream] = {}
+        # Reentrante: cancelar un Future ejecuta su callback (_forget) en el mismo hilo.
+        self._lock = threading.RLock()
+        # video_id -> (Future de la extraccion, es_de_play).
+        self._inflight: dict[str, tuple[Future, bool]] = {}
+        # Ultimo video_id pedido por resolve_async: los plays anteriores en cola se descartan.
+        self._play_wanted: Optional[str] = None
+        self.retry_after = retry_after
+        # video_id -> instante (monotonic) de la ultima extraccion fallida.
+        self._failed: dict[str, float] = {}
+        self.workers = max(1, workers)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="yt-dlp")
+        # Al menos dos: una extraccion colgada de un click abandonado no frena el siguiente.
+        self._foreground = ThreadPoolExecutor(
+            max_workers=max(2, play_workers), thread_name_prefix="yt-dlp-play"
+        )
+        self._local = threading.local()
+
+    @property
+    def available(self) -> bool:
+        return _YT_DLP_FOUND
+
+    def warm_up(self) -> None:
+        """Crea el YoutubeDL del worker de play (import + extractores) antes del primer play.
+
+        Bloqueante: llamar desde un hilo. Los workers de prefetch se inicializan solos.
+        """
+        if not self.available:
+            return
+        with self.metrics.time("resolver_warmup"):
+            self._foreground.submit(self._get_ydl).result()
+
+    async def resolve_async(self, video_id: str) -> Optional[ResolvedStream]:
+        """resolve() en los workers de play, esperable desde asyncio (no cuenta hit/miss).
+
+        Si el video ya se esta extrayendo (prefetch u otro play) espera esa extraccion;
+        una precarga que sigue en cola se cancela y pasa al pool de play. Cancelar la
+        tarea no corta la extraccion: queda en cache para el proximo intento.
+        """
+        return await asyncio.shield(asyncio.wrap_future(self._submit(video_id, play=True)))
+
+    def _submit(self, video_id: str, play: bool) -> Future:
+        with self._lock:
+            if play:
+                self._play_wanted = video_id
+            current = self._inflight.get(video_id)
+            if current is not None:
+                future, is_play = current
+                # Una precarga que no arranco esperaria detras de otras: se pasa a play.
+                if is_play or not play or not future.cancel():
+                    return future
+            executor = self._foreground if play else self._pool
+            future = executor.submit(self._run, video_id, play)
+            self._inflight[video_id] = (future, play)
+        future.add_done_callback(partial(self._forget, video_id))
+        return future
+
+    def _run(self, video_id: str, play: bool) -> Optional[ResolvedStream]:
+        if play:
+            with self._lock:
+                stale = video_id != self._play_wanted
+            if stale:
+                # Click reemplazado por otro mientras esperaba en cola.
+                return None
+        return self.resolve(video_id, record=False)
+
+    def _forget(self, video_id: str, future: Future) -> None:
+        with self._lock:
+            current = self._inflight.get(video_id)
+            if current is not None and current[0] is future:
+                del self._inflight[video_id]
+
+    def cached(self, video_id: str, record: bool = True) -> Optional[ResolvedStream]:
+        """Stream vigente desde memoria o disco, sin tocar la red."""
+        stream = self._lookup(video_id)
+        if record:
+            self.metrics.incr("stream_hit" if stream else "stream_miss")
+        return stream
+
+    def _lookup(self, video_id: str) -> Optional[ResolvedStream]:
+        if not video_id:
+            return None
+        with self._lock:
+            stream = self._memory.get(video_id)
+        if stream is None:
+            entry = self.cache.get(video_id)
+            if entry is not None and isinstance(entry.value, dict):
+                try:
+                    stream = ResolvedStream(**entry.value)
+                except Exception:
+                    stream = None
+                if stream is not None:
+                    with self._lock:
+                        self._memory[video_id] = stream
+        if stream is not None and stream.valid():
+            return stream
+        return None
+
+    def resolve(self, video_id: str, record: bool = True) -> Optional[ResolvedStream]:
+        """Stream desde cache o extrayendolo con yt-dlp (bloqueante). None si falla."""
+        stream = self.cached(video_id, record=record)
+        if stream is not None:
+            return stream
+        if not self.available or not video_id:
+            return None
+        try:
+            with self.metrics.time("resolve"):
+                stream = self._extract(video_id)
+        except Exception:
+            self.metrics.incr("resolve_error")
+            with self._lock:
+                self._failed[video_id] = time.monotonic()
+            return None
+        with self._lock:
+            self._failed.pop(video_id, None)
+        self._store(stream)
+        return stream
+
+    def mark_failed(self, video_id: str) -> None:
+        """Registra un fallo externo (p.ej. timeout del play) para no reintentar por retry_after."""
+        with self._lock:
+            self._failed[video_id] = time.monotonic()
+
+    def recently_failed(self, video_id: str) -> bool:
+        with self._lock:
+            failed_at = self._failed.get(video_id)
+        return failed_at is not None and time.monotonic() - failed_at < self.retry_after
+
+    def prefetch(self, video_id: str) -> None:
+        """Resuelve en un hilo aparte para que el proximo play encuentre la URL en cache."""
+        if not self.available or not video_id or self.recently_failed(video_id):
+            return
+        self._submit(video_id, play=False)
+
+    def invalidate(self, video_id: str) -> None:
+        with self._lock:
+            self._memory.pop(video_id, None)
+        self.cache.delete(video_id)
+
+    def stats(self) -> dict[str, float]:
+        hits = self.metrics.count("stream_hit")
+        misses = self.metrics.count("stream_miss")
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": (hits / total) if total else 0.0,
+            "resolve_ms": (self.metrics.mean("resolve") or 0.0) * 1000,
+        }
+
+    def _store(self, stream: ResolvedStream) -> None:
+        with self._lock:
+            self._memory[stream.video_id] = stream
+        ttl = stream.expires - time.time()
+        if ttl > 0:
+            self.cache.set(stream.video_id, asdict(stream), ttl=ttl)
+
+    def _get_ydl(self) -> Any:
+        """YoutubeDL del hilo actual; YoutubeDL no es seguro para uso concurrente."""
+        global yt_dlp
+        ydl = getattr(self._local, "ydl", None)
+        if ydl is None:
+            if yt_dlp is None:
+                import yt_dlp as _yt_dlp  # type: ignore
+
+                yt_dlp = _yt_dlp
+            ydl = yt_dlp.YoutubeDL(
+                {
+                    "format": self.audio_format,
+                    "quiet": True,
+                    "no_warnings": True,
+                    "noplaylist": True,
+                    "skip_download": True,
+                }
+            )
+            ydl.get_info_extractor("Youtube")
+            self._local.ydl = ydl
+        return ydl
+
+    def _extract(self, video_id: str) -> ResolvedStream:
+        ydl = self._get_ydl()
+        info = ydl.extract_info(f"https://www.youtube.com/watch?v={video_id}", download=False)
+        return self._stream_from_info(video_id, ydl.sanitize_info(info))
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._foreground.shutdown(wait=False, cancel_futures=True)
+
+    def _stream_from_info(self, video_id: str, info: dict) -> ResolvedStream:
+        url = info.get("url")
+        headers = info.get("http_headers") or {}
+        ext = info.get("ext") or ""
+        if not url:
+            requested = info.get("requested_formats") or []
+            if requested:
+                url = requested[0].get("url")
+                headers = requested[0].get("http_headers") or headers
+                ext = requested[0].get("ext") or ext
+        if not url:
+            raise RuntimeError("yt-dlp no devolvio URL de audio")
+        match = _EXPIRE_RE.search(url)
+        expires = float(match.group(1)) if match else time.time() + self.default_lifetime
+        return ResolvedStream(video_id, url, expires, dict(headers), ext)
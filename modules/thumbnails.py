@@ -0,0 +1,60 @@
+"""Eleccion de la miniatura mas chica que alcanza para el tamaño en que se va a mostrar."""
+import re
+from typing import Any, List, Optional
+
+from modules.models import SearchResult, Thumbnail
+
+# Miniaturas de googleusercontent / ggpht: ".../abc=w120-h120-l90-rj" o ".../abc=s120".
+_SIZE_PARAM_RE = re.compile(r"=(?:w\d+-h\d+|s\d+)(?P<rest>(?:-[^/=?]*)?)$")
+
+
+def parse_thumbnails(raw: Any) -> List[Thumbnail]:
+    """Convierte la lista "thumbnails" de ytmusicapi, ignorando entradas sin URL."""
+    if not isinstance(raw, list):
+        return []
+    thumbs: List[Thumbnail] = []
+    for item in raw:
+        if not isinstance(item, dict) or not item.get("url"):
+            continue
+        try:
+            width = int(item.get("width") or 0)
+            height = int(item.get("height") or 0)
+        except (TypeError, ValueError):
+            width = height = 0
+        thumbs.append(Thumbnail(item["url"], width, height))
+    return thumbs
+
+
+def resize_thumbnail_url(url: str, width: int, height: int) -> Optional[str]:
+    """Reescribe el parametro de tamaño de la URL, o None si el servidor no lo soporta."""
+    match = _SIZE_PARAM_RE.search(url)
+    if not match:
+        return None
+    return f"{url[: match.start()]}=w{width}-h{height}{match.group('rest')}"
+
+
+def select_thumbnail(thumbnails: List[Thumbnail], size: int) -> str:
+    """URL de la variante mas chica cuyo lado menor cubre `size` px.
+
+    Si la URL admite parametros de tamaño se pide exactamente size x size; si ninguna
+    variante alcanza se usa la mas grande. Las variantes sin dimensiones van al final.
+    """
+    if not thumbnails:
+        return ""
+    known = sorted((t for t in thumbnails if t.width and t.height), key=lambda t: t.width * t.height)
+    if not known:
+        chosen = thumbnails[-1]
+    else:
+        chosen = next((t for t in known if min(t.width, t.height) >= size), known[-1])
+    if min(chosen.width, chosen.height) != size:
+        resized = resize_thumbnail_url(chosen.url, size, size)
+        if resized:
+            return resized
+    return chosen.url
+
+
+def thumbnail_url_for(item: SearchResult, size: int) -> str:
+    """Mejor URL de caratula para mostrar a `size` px (o thumbnail_url si no hay variantes)."""
+    if item.thumbnails:
+        return select_thumbnail(item.thumbnails, size)
+    return resize_thumbnail_url(item.thumbnail_url, size, size) or item.thumbnail_url
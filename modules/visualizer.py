@@ -1,11 +1,15 @@
-"""Visualizer helper to fetch energy from PulseAudio monitor (via sounddevice) with fallback."""
-import queue
+"""Visualizer helper to fetch energy from mpv (astats tap) or a PulseAudio monitor, with fallback."""
+import os
 import threading
 import time
-from typing import Optional
+from typing import Callable, Optional
 
 import numpy as np
 
+from modules.beats import BeatTracker
+from modules.ringbuffer import RingBuffer
+from modules.spectrum import SpectrumAnalyzer
+
 try:
     import sounddevice as sd
 
@@ -15,7 +19,17 @@ except Exception:
 
 
 class Visualizer:
-    """Captura energia real desde un dispositivo de entrada (p.ej. monitor PulseAudio)."""
+    """Energia del audio que suena, desde una de estas fuentes:
+
+    - "mpv": niveles del stream decodificado por mpv (level_source, filtro astats);
+      no abre un segundo stream de audio ni necesita dispositivo monitor.
+    - "monitor": captura con sounddevice desde un dispositivo de entrada (p.ej. monitor
+      PulseAudio).
+    "auto" (default, o env YTPLAYER_VISUALIZER) prueba en ese orden; si ninguna anda
+    se usa un generador sintetico basado en el volumen. Si la fuente "mpv" no entrega
+    niveles durante tap_timeout segundos mientras se analiza (p.ej. no hay filtro de
+    medicion), is_real pasa a False y la UI usa su fallback hasta que vuelvan.
+    """
 
     def __init__(
         self,
@@ -23,20 +37,62 @@ class Visualizer:
         device: Optional[int] = None,
         samplerate: int = 44100,
         chunk: int = 1024,
+        source: Optional[str] = None,
+        level_source: Optional[Callable[[], Optional[tuple[float, float]]]] = None,
+        tap_interval: float = 0.025,
+        tap_timeout: float = 3.0,
+        bands: int = 32,
+        analysis_rate: float = 20.0,
+        history_size: int = 4096,
+        beat_tracking: bool = True,
     ) -> None:
         self.mpv_player = mpv_player  # instancia interna de mpv para fallback
+        # Devuelve (RMS, pico) en dBFS del audio de mpv, o None sin audio.
+        self.level_source = level_source
+        self.source = (source or os.environ.get("YTPLAYER_VISUALIZER") or "auto").lower()
+        self.tap_interval = tap_interval
+        self.tap_timeout = tap_timeout
+        # Desde cuando (monotonic) level_source viene devolviendo None; None si hay niveles.
+        self._tap_missing_since: Optional[float] = None
+        self.active_source = ""
         self.device = device
         self.samplerate = samplerate
         self.chunk = chunk
-        self.energy_queue: queue.Queue[float] = queue.Queue(maxsize=1)
+        # Historial de energia (productor: hilo de captura/analisis; lector: UI).
+        self.history = RingBuffer(history_size)
+        # Espectro por bandas (solo con captura PCM, fuente "monitor").
+        self.spectrum = SpectrumAnalyzer(samplerate, chunk, bands)
+        self._bands_lock = threading.Lock()
+        # El callback de PortAudio solo copia frames aca; el analisis corre en otro hilo
+        # a analysis_rate Hz (lo que necesita la UI), salteando los bloques intermedios.
+        self.analysis_rate = analysis_rate
+        self._frames = RingBuffer(chunk * 16, (2,))
+        self._block = np.zeros((chunk, 2), dtype=np.float32)
+        self.overruns = 0  # bloques con input overflow informado por PortAudio
+        self.dropped = 0  # lecturas descartadas porque el callback piso los frames
+        self.skipped = 0  # bloques no analizados por decimacion
+        self.analyzed = 0
+        # Beats/BPM: a diferencia del espectro, se analiza cada bloque (bandas gruesas,
+        # muy barato), pero solo mientras analysis_rate > 0: en 0 no se lee nada.
+        self.beat_tracking = beat_tracking
+        self.beats = BeatTracker(samplerate / chunk)
+        self._onset_spectrum = SpectrumAnalyzer(samplerate, chunk, bands=8, smoothing=0.0)
+        self._beat_block = np.zeros((chunk, 2), dtype=np.float32)
         self._stop_event = threading.Event()
         self._thread: Optional[threading.Thread] = None
         self._stream = None
         self._use_real_audio = False
 
     def start(self) -> None:
-        """Inicia captura; si falla, usa generador sintetico."""
-        if SOUNDDEVICE_AVAILABLE:
+        """Inicia captura segun `source`; si falla, usa generador sintetico."""
+        if self.source in ("auto", "mpv") and self.level_source is not None:
+            self._use_real_audio = True
+            self.active_source = "mpv"
+            self.beats = BeatTracker(1.0 / self.tap_interval)
+            self._thread = threading.Thread(target=self._tap_loop, daemon=True)
+            self._thread.start()
+            return
+        if self.source in ("auto", "monitor") and SOUNDDEVICE_AVAILABLE:
             try:
                 self._stream = sd.InputStream(
                     device=self.device,
@@ -48,12 +104,16 @@ class Visualizer:
                 )
                 self._stream.start()
                 self._use_real_audio = True
+                self.active_source = "monitor"
+                self._thread = threading.Thread(target=self._analysis_loop, daemon=True)
+                self._thread.start()
                 return
             except Exception as exc:  # noqa: BLE001
                 print(f"[Visualizer] No se pudo iniciar captura real: {exc}")
 
         # fallback: generar energia sinteticamente
         self._use_real_audio = False
+        self.active_source = "sintetico"
         self._thread = threading.Thread(target=self._fake_energy_loop, daemon=True)
         self._thread.start()
 
@@ -70,13 +130,93 @@ class Visualizer:
             self._thread.join(timeout=1)
 
     def _audio_callback(self, indata, frames, time_info, status) -> None:  # type: ignore[override]
+        # Hilo de tiempo real: nada de analisis ni locks, solo copiar al ring.
         if status:
-            return
-        mono = np.mean(indata, axis=1)
-        fft_data = np.abs(np.fft.rfft(mono))
-        max_val = np.max(fft_data) or 1.0
-        energy = float(np.mean(fft_data / max_val))
-        self._push_energy(energy)
+            self.overruns += 1
+        self._frames.extend(indata)
+
+    def _analysis_loop(self) -> None:
+        """Analiza el bloque mas reciente del ring a analysis_rate Hz (0 = pausado)."""
+        last = 0
+        beat_pos = 0
+        while not self._stop_event.wait(1.0 / self.analysis_rate if self.analysis_rate > 0 else 0.25):
+            at = self._frames.written
+            if self.analysis_rate <= 0:
+                # Nadie mira el visualizador: ni espectro ni beats; al volver se sigue desde aca.
+                last = beat_pos = at
+                continue
+            if self.beat_tracking:
+                beat_pos = self._track_beats(beat_pos, at)
+            fresh = at - last
+            if fresh < self.chunk:
+                continue
+            self.skipped += fresh // self.chunk - 1
+            last = at
+            np.copyto(self._block, self._frames.view(self.chunk, at=at))
+            if self._frames.overwritten(self.chunk, at, margin=self.chunk):
+                self.dropped += 1
+                continue
+            with self._bands_lock:
+                self.spectrum.process(self._block)
+                energy = self.spectrum.level
+            self.analyzed += 1
+            self._push_energy(energy)
+
+    def _track_beats(self, pos: int, at: int) -> int:
+        """Pasa al BeatTracker cada bloque completo entre pos y at; devuelve la nueva posicion."""
+        # Si el lector quedo muy atras, retomar desde lo que el ring todavia conserva.
+        pos = max(pos, at - self._frames.capacity + 2 * self.chunk)
+        while at - pos >= self.chunk:
+            pos += self.chunk
+            np.copyto(self._beat_block, self._frames.view(self.chunk, at=pos))
+            if self._frames.overwritten(self.chunk, pos, margin=self.chunk):
+                self.dropped += 1
+                continue
+            bands = self._onset_spectrum.process(self._beat_block)
+            # Tiempo del stream (frames / samplerate): uniforme aunque se procese por tandas.
+            self.beats.update_spectrum(bands, now=pos / self.samplerate)
+        return pos
+
+    def stats(self) -> dict[str, float]:
+        """Contadores de la captura PCM y tiempo del ultimo analisis."""
+        return {
+            "analyzed": self.analyzed,
+            "skipped": self.skipped,
+            "dropped": self.dropped,
+            "overruns": self.overruns,
+            "process_ms": self.spectrum.process_time * 1000,
+        }
+
+    def _tap_loop(self) -> None:
+        """Lee los niveles de mpv a ~40 Hz (un bloque decodificado cada ~20-25 ms).
+
+        Con analysis_rate 0 (pausa, oculto, sin foco) no consulta a mpv.
+        """
+        source = self.level_source
+        while not self._stop_event.is_set() and source is not None:
+            if self.analysis_rate <= 0:
+                self._tap_missing_since = None
+                self._stop_event.wait(0.25)
+                continue
+            try:
+                levels = source()
+            except Exception:
+                levels = None
+            if levels:
+                self._tap_missing_since = None
+            elif self._tap_missing_since is None:
+                self._tap_missing_since = time.monotonic()
+            if self.beat_tracking:
+                self.beats.update_level(levels[0] if levels else float("-inf"))
+            self._push_energy(self._db_to_energy(levels[0]) if levels else 0.0)
+            self._stop_event.wait(self.tap_interval)
+
+    @staticmethod
+    def _db_to_energy(db: float, floor: float = -60.0) -> float:
+        """dBFS -> 0..1 lineal en escala de dB (floor dB o menos = 0)."""
+        if db != db or db <= floor:
+            return 0.0
+        return min(1.0, (db - floor) / -floor)
 
     def _fake_energy_loop(self) -> None:
         """Genera energia aproximada en base a mpv (volumen)."""
@@ -92,22 +232,24 @@ class Visualizer:
             time.sleep(0.1)
 
     def _push_energy(self, energy: float) -> None:
-        try:
-            self.energy_queue.get_nowait()
-        except queue.Empty:
-            pass
-        try:
-            self.energy_queue.put_nowait(energy)
-        except queue.Full:
-            pass
+        self.history.push(energy)
 
     def get_energy(self) -> float:
         """Devuelve el ultimo valor de energia disponible."""
-        try:
-            return self.energy_queue.get_nowait()
-        except queue.Empty:
-            return 0.0
+        at = self.history.written
+        return float(self.history.view(1, at=at)[0]) if at else 0.0
+
+    def get_bands(self) -> Optional[tuple[np.ndarray, np.ndarray]]:
+        """Copia de (bandas, picos) 0-1, o None si la fuente no da espectro."""
+        if self.active_source != "monitor":
+            return None
+        with self._bands_lock:
+            return self.spectrum.bands.copy(), self.spectrum.peaks.copy()
 
     @property
     def is_real(self) -> bool:
+        """True si la energia sale de audio real; la fuente "mpv" deja de serlo si no da niveles."""
+        missing_since = self._tap_missing_since
+        if missing_since is not None and time.monotonic() - missing_since >= self.tap_timeout:
+            return False
         return self._use_real_audio
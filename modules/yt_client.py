@@ -1,24 +1,67 @@
-import json
+import asyncio
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from functools import partial
 from pathlib import Path
-from typing import Callable, List, Optional
-from urllib.parse import quote_plus
-from urllib.request import urlopen
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional
 
 from ytmusicapi import YTMusic
 
+from modules.cache import SqliteCache
+from modules.http_client import AsyncHttpClient, HttpClient, get_async_http_client, get_http_client
+from modules.lyrics import LyricsProvider, LyricsStore, is_transient_error, lyrics_score, public_providers
 from modules.models import SearchResult
+from modules.thumbnails import parse_thumbnails
 
 
 class YouTubeMusicClient:
-    def __init__(self, cookies_path: Optional[str] = None) -> None:
+    def __init__(
+        self,
+        cookies_path: Optional[str] = None,
+        search_cache: Optional[SqliteCache] = None,
+        search_ttl: float = 6 * 3600,
+        search_cache_size: int = 500,
+        background_refresh: bool = True,
+        http: Optional[HttpClient] = None,
+    ) -> None:
         """
         Inicializa YTMusic. Si hay cookies disponibles (parametro o env YTMUSIC_COOKIES / YTMUSIC_COOKIE_FILE),
         las usa para mejorar resultados (incl. letras). Si fallan, cae a modo sin auth.
+        Las busquedas se guardan en una cache SQLite (TTL + LRU); una entrada vencida se
+        devuelve igual y se refresca en segundo plano si background_refresh esta activo.
+        Las letras (proveedores publicos y su cache) las maneja AsyncYouTubeMusicClient.
         """
         self._using_cookies: bool = False
-        self.last_lyrics_source: str = ""
-        self._yt = self._init_ytmusic(cookies_path)
+        self._http = http or get_http_client()
+        self.last_search_cached: bool = False
+        self.background_refresh = background_refresh
+        self.search_cache = search_cache or SqliteCache(
+            "search", ttl=search_ttl, max_entries=search_cache_size
+        )
+        self._refreshing: set[str] = set()
+        self._refresh_lock = threading.Lock()
+        self._cookies_path = cookies_path
+        self._yt_instance: Optional[YTMusic] = None
+        self._yt_lock = threading.Lock()
+
+    @property
+    def _yt(self) -> YTMusic:
+        """Instancia de YTMusic creada en el primer uso (o antes via warm_up)."""
+        return self._ensure_client()
+
+    def _ensure_client(self) -> YTMusic:
+        if self._yt_instance is None:
+            with self._yt_lock:
+                if self._yt_instance is None:
+                    self._yt_instance = self._init_ytmusic(self._cookies_path)
+        return self._yt_instance
+
+    def warm_up(self) -> None:
+        """Construye YTMusic por adelantado; pensado para correr en un hilo al iniciar la UI."""
+        self._ensure_client()
 
     @staticmethod
     def _discover_cookies() -> Optional[Path]:
@@ -46,19 +89,178 @@ class YouTubeMusicClient:
         discovered = self._discover_cookies()
         if discovered:
             candidates.append(str(discovered))
+        tried: set[str] = set()
         for candidate in candidates:
-            if candidate and os.path.exists(candidate):
+            if not candidate or candidate in tried:
+                continue
+            tried.add(candidate)
+            if os.path.exists(candidate):
                 try:
                     self._using_cookies = True
-                    return YTMusic(candidate)
+                    return YTMusic(candidate, requests_session=self._http.session)
                 except Exception:
                     continue
         # Fallback sin cookies
         self._using_cookies = False
-        return YTMusic()
+        return YTMusic(requests_session=self._http.session)
 
     def search_songs(self, query: str, limit: int = 20) -> List[SearchResult]:
-        raw_results = self._yt.search(query, filter="songs", limit=limit)
+        """Busca canciones; sirve desde cache si existe (refrescando en segundo plano si vencio)."""
+        cached = self.cached_search(query, limit)
+        self.last_search_cached = cached is not None
+        if cached is not None:
+            return cached
+        return self.fetch_search(query, limit)
+
+    def iter_search_songs(self, query: str, limit: int = 100, page_size: int = 20) -> Iterator[List[SearchResult]]:
+        """Entrega los resultados por paginas a medida que llegan (desde cache, en tandas de page_size)."""
+        cached = self.cached_search(query, limit)
+        self.last_search_cached = cached is not None
+        if cached is not None:
+            yield from self.batches(cached, page_size)
+            return
+        yield from self.stream_search(query, limit)
+
+    def stream_search(self, query: str, limit: int) -> Iterator[List[SearchResult]]:
+        """Busca en YouTube Music pagina por pagina (cada next() es bloqueante).
+
+        La primera pagina sale de la respuesta inicial; las siguientes se piden con su
+        token de continuacion. La lista combinada se cachea solo si la busqueda termina.
+        """
+        results: List[SearchResult] = []
+        try:
+            for page in self._search_pages(query, limit):
+                page = page[: limit - len(results)]
+                results.extend(page)
+                yield page
+        except Exception:
+            if not results:
+                raise
+            # Fallo una continuacion: quedan las filas que ya llegaron, sin cachear.
+            return
+        self._store_search(self._search_key(query, "songs", limit), results)
+
+    @staticmethod
+    def batches(results: List[SearchResult], page_size: int) -> Iterator[List[SearchResult]]:
+        """Parte los resultados en listas de page_size (al menos una, aunque este vacia)."""
+        size = max(1, page_size)
+        yield results[:size]
+        for start in range(size, len(results), size):
+            yield results[start : start + size]
+
+    @staticmethod
+    def _search_key(query: str, search_filter: str, limit: int) -> str:
+        normalized = " ".join(query.lower().split())
+        return f"{search_filter}|{limit}|{normalized}"
+
+    def cached_search(self, query: str, limit: int) -> Optional[List[SearchResult]]:
+        """Resultados cacheados o None; si la entrada vencio agenda un refresco en segundo plano.
+
+        Lee SQLite: desde asyncio llamarlo via to_thread.
+        """
+        key = self._search_key(query, "songs", limit)
+        entry = self.search_cache.get(key, allow_expired=self.background_refresh)
+        if entry is None:
+            return None
+        try:
+            results = [SearchResult(**row) for row in entry.value]
+        except Exception:
+            return None
+        if not results:
+            # Entradas vacias de versiones anteriores: se vuelve a buscar.
+            return None
+        if entry.expired:
+            self._refresh_search_async(key, query, limit)
+        return results
+
+    def fetch_search(self, query: str, limit: int) -> List[SearchResult]:
+        """Busca en YouTube Music (bloqueante) y guarda el resultado en la cache."""
+        return self._search_and_store(self._search_key(query, "songs", limit), query, limit)
+
+    def _search_and_store(self, key: str, query: str, limit: int) -> List[SearchResult]:
+        results = self._search_remote(query, limit)
+        self._store_search(key, results)
+        return results
+
+    def _store_search(self, key: str, results: List[SearchResult]) -> None:
+        # Una busqueda vacia puede ser un fallo pasajero: no se cachea (la vencida se seguiria sirviendo).
+        if results:
+            self.search_cache.set(key, [asdict(r) for r in results])
+
+    def _refresh_search_async(self, key: str, query: str, limit: int) -> None:
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def _worker() -> None:
+            try:
+                self._search_and_store(key, query, limit)
+            except Exception:
+                pass
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=_worker, daemon=True).start()
+
+    def _search_remote(self, query: str, limit: int) -> List[SearchResult]:
+        return [row for page in self._search_pages(query, limit) for row in page][:limit]
+
+    def _search_pages(self, query: str, limit: int) -> Iterator[List[SearchResult]]:
+        """Paginas del filtro "songs": respuesta inicial y luego sus continuaciones.
+
+        search() de ytmusicapi pide todas las continuaciones antes de volver, asi que se
+        usan sus helpers de paginacion; si no coinciden con la version instalada se cae
+        a un search() completo en una sola pagina.
+        """
+        try:
+            body, shelf, page = self._first_search_page(query)
+        except (ImportError, AttributeError, KeyError, IndexError, TypeError):
+            yield self._parse_items(self._yt.search(query, filter="songs", limit=limit))
+            return
+        yield page
+        count = len(page)
+        while shelf is not None and "continuations" in shelf and count < limit:
+            shelf, page = self._next_search_page(body, shelf)
+            if not page:
+                break
+            count += len(page)
+            yield page
+
+    def _first_search_page(self, query: str) -> tuple[dict, Optional[dict], List[SearchResult]]:
+        from ytmusicapi.parsers.search import get_search_params
+
+        body = {"query": query, "params": get_search_params("songs", None, False)}
+        response = self._yt._send_request("search", dict(body))
+        contents = response.get("contents")
+        if not contents:
+            return body, None, []
+        if "tabbedSearchResultsRenderer" in contents:
+            contents = contents["tabbedSearchResultsRenderer"]["tabs"][0]["tabRenderer"]["content"]
+        for section in contents["sectionListRenderer"]["contents"]:
+            shelf = section.get("musicShelfRenderer")
+            if shelf:
+                return body, shelf, self._parse_shelf_items(shelf.get("contents") or [])
+        return body, None, []
+
+    def _next_search_page(self, body: dict, shelf: dict) -> tuple[Optional[dict], List[SearchResult]]:
+        from ytmusicapi.continuations import get_continuation_contents, get_continuation_params
+
+        response = self._yt._send_request("search", dict(body), get_continuation_params(shelf))
+        shelf = (response.get("continuationContents") or {}).get("musicShelfContinuation")
+        if not shelf:
+            return None, []
+        return shelf, get_continuation_contents(shelf, self._parse_shelf_items)
+
+    def _parse_shelf_items(self, items: list) -> List[SearchResult]:
+        from ytmusicapi.parsers.search import parse_search_results
+
+        rows = [item for item in items if "musicResponsiveListItemRenderer" in item]
+        return self._parse_items(parse_search_results(rows, resultType="song", category=None))
+
+    @staticmethod
+    def _parse_items(raw_results: list) -> List[SearchResult]:
         parsed: List[SearchResult] = []
         for item in raw_results:
             title = item.get("title") or "Sin titulo"
@@ -68,15 +270,89 @@ class YouTubeMusicClient:
             album = album_info.get("name") or "-"
             duration = item.get("duration") or "-"
             video_id = item.get("videoId") or ""
-            thumbs = item.get("thumbnails") or []
-            thumb_url = ""
-            if isinstance(thumbs, list) and thumbs:
-                # tomar el de mayor resolucion (ultimo)
-                thumb_url = thumbs[-1].get("url", "") or thumbs[0].get("url", "")
-            parsed.append(SearchResult(title, artist, album, duration, video_id, thumb_url))
+            thumbs = parse_thumbnails(item.get("thumbnails"))
+            # thumbnail_url: la de mayor resolucion (ultima); la cover elige variante con select_thumbnail.
+            thumb_url = thumbs[-1].url if thumbs else ""
+            parsed.append(SearchResult(title, artist, album, duration, video_id, thumb_url, thumbs))
         return parsed
 
-    def get_song_lyrics(
+    def get_ytm_lyrics(self, video_id: str) -> str | None:
+        """Letra via YouTube Music (bloqueante); los errores de red se propagan al llamador."""
+        if not video_id:
+            return None
+        watch = self._yt.get_watch_playlist(video_id)
+        lyrics_data = watch.get("lyrics") if isinstance(watch, dict) else None
+        browse_id = lyrics_data.get("browseId") if isinstance(lyrics_data, dict) else None
+        if not browse_id:
+            return None
+        lyrics_payload = self._yt.get_lyrics(browse_id)
+        if isinstance(lyrics_payload, dict):
+            return lyrics_payload.get("lyrics")
+        return None
+
+
+class AsyncYouTubeMusicClient:
+    """API asyncio sobre YouTubeMusicClient (comparte YTMusic y la cache de busquedas).
+
+    Los proveedores publicos de letras van por AsyncHttpClient: cancelar la tarea cierra
+    el socket. ytmusicapi es sincronico, asi que sus llamadas usan un pool propio y acotado;
+    si la tarea se cancela antes de que la llamada arranque, nunca llega a ejecutarse.
+    Las lecturas/escrituras de SQLite (busquedas y letras) van por to_thread.
+
+    Con race_lyrics los proveedores publicos se consultan en paralelo; una letra
+    sincronizada gana de inmediato y una plana espera lyrics_grace segundos por una mejor.
+    """
+
+    def __init__(
+        self,
+        client: YouTubeMusicClient,
+        http: Optional[AsyncHttpClient] = None,
+        max_blocking: int = 2,
+        lyrics_store: Optional[LyricsStore] = None,
+        race_lyrics: bool = True,
+        lyrics_grace: float = 1.5,
+    ) -> None:
+        self.client = client
+        self.last_lyrics_source: str = ""
+        self.last_search_cached: bool = False
+        self.lyrics_store = lyrics_store or LyricsStore()
+        self.race_lyrics = race_lyrics
+        self.lyrics_grace = lyrics_grace
+        self._http = http or get_async_http_client()
+        self._executor = ThreadPoolExecutor(max_workers=max_blocking, thread_name_prefix="ytmusic")
+
+    async def _run_blocking(self, fn: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, *args))
+
+    async def search_songs(self, query: str, limit: int = 20) -> List[SearchResult]:
+        cached = await asyncio.to_thread(self.client.cached_search, query, limit)
+        self.last_search_cached = cached is not None
+        if cached is not None:
+            return cached
+        return await self._run_blocking(self.client.fetch_search, query, limit)
+
+    async def iter_search_songs(
+        self, query: str, limit: int = 100, page_size: int = 20
+    ) -> AsyncIterator[List[SearchResult]]:
+        """Version asyncio de YouTubeMusicClient.iter_search_songs: cada pagina se pide en el pool."""
+        client = self.client
+        cached = await asyncio.to_thread(client.cached_search, query, limit)
+        self.last_search_cached = cached is not None
+        if cached is not None:
+            for batch in client.batches(cached, page_size):
+                yield batch
+                # Dejar pintar la tanda antes de agregar la siguiente.
+                await asyncio.sleep(0)
+            return
+        pages = client.stream_search(query, limit)
+        while True:
+            page = await self._run_blocking(next, pages, None)
+            if page is None:
+                return
+            yield page
+
+    async def get_song_lyrics(
         self,
         video_id: str,
         title: Optional[str] = None,
@@ -84,134 +360,111 @@ class YouTubeMusicClient:
         album: Optional[str] = None,
         duration: Optional[str] = None,
     ) -> str | None:
-        """Devuelve letra desde YouTube Music, con fallback a API publica si es necesario."""
+        """Letra desde YouTube Music, con fallback a APIs publicas; todo pasa por lyrics_store."""
+        store = self.lyrics_store
         self.last_lyrics_source = ""
+        video_key = store.video_key(video_id)
+        cached = await asyncio.to_thread(store.get, video_key)
+        if cached is not None:
+            self.last_lyrics_source = cached[1]
+            return cached[0]
+        failed = False
         # Primero intentar con YouTube Music.
-        lyrics = self._get_ytm_lyrics(video_id)
+        try:
+            lyrics = await self._run_blocking(self.client.get_ytm_lyrics, video_id)
+        except Exception as exc:  # noqa: BLE001
+            lyrics = None
+            failed = is_transient_error(exc)
         if lyrics:
             self.last_lyrics_source = "YouTube Music"
+            await asyncio.to_thread(store.store, video_key, lyrics, self.last_lyrics_source)
             return lyrics
         # Fallback publico si tenemos artista y titulo.
-        if title and artist:
-            fallback = self._get_public_lyrics(title, artist, album, duration)
-            if fallback:
-                return fallback
-        return None
-
-    def _get_ytm_lyrics(self, video_id: str) -> str | None:
-        if not video_id:
-            return None
-        try:
-            watch = self._yt.get_watch_playlist(video_id)
-            lyrics_data = watch.get("lyrics") if isinstance(watch, dict) else None
-            browse_id = lyrics_data.get("browseId") if isinstance(lyrics_data, dict) else None
-            if not browse_id:
-                return None
-            lyrics_payload = self._yt.get_lyrics(browse_id)
-            if isinstance(lyrics_payload, dict):
-                return lyrics_payload.get("lyrics")
-        except Exception:
+        if not (title and artist):
+            await asyncio.to_thread(store.store, video_key, None, "", failed)
             return None
-        return None
+        public_key = store.public_key(title, artist, duration)
+        cached = await asyncio.to_thread(store.get, public_key)
+        if cached is not None:
+            self.last_lyrics_source = cached[1]
+            await asyncio.to_thread(store.store, video_key, cached[0], cached[1])
+            return cached[0]
+        fallback, source, public_failed = await self.get_public_lyrics(title, artist, album, duration)
+        self.last_lyrics_source = source
 
-    def _get_public_lyrics(
-        self, title: str, artist: str, album: Optional[str] = None, duration: Optional[str] = None
-    ) -> str | None:
-        """Consulta APIs publicas para obtener letras sin cookies."""
-        fetchers: list[Callable[..., Optional[str]]] = [
-            self._get_lrclib,
-            self._get_lyrist_lyrics,
-            self._get_lyrics_ovh,
-        ]
-        for fetch in fetchers:
-            if fetch is self._get_lrclib:
-                lyrics = fetch(title, artist, album, duration)
-            else:
-                lyrics = fetch(title, artist)
-            if lyrics:
-                return lyrics
-        return None
+        def _store_both() -> None:
+            store.store(public_key, fallback, source, public_failed)
+            store.store(video_key, fallback, source, failed or public_failed)
+
+        await asyncio.to_thread(_store_both)
+        return fallback
+
+    async def fetch_public(self, url: str, parser: Callable[[Any], Optional[str]]) -> Optional[str]:
+        return parser(await self._http.get_json(url))
 
-    def _get_lrclib(
+    async def get_public_lyrics(
         self, title: str, artist: str, album: Optional[str] = None, duration: Optional[str] = None
-    ) -> Optional[str]:
-        """Consulta lrclib.net (sin API key, retorna plain/synced lyrics)."""
-        try:
-            params = [
-                ("track_name", title),
-                ("artist_name", artist),
-                ("album_name", album or ""),
-            ]
-            duration_secs = self._duration_to_seconds(duration)
-            if duration_secs is not None:
-                params.append(("duration", str(duration_secs)))
-            query = "&".join(f"{k}={quote_plus(v)}" for k, v in params if v)
-            base = "https://lrclib.net/api/get" if duration_secs is not None else "https://lrclib.net/api/search"
-            url = f"{base}?{query}"
-            headers = {"User-Agent": "ytplayer/0.1 (https://github.com)"}
-            with urlopen(url, timeout=8) as resp:
-                if resp.status != 200:
-                    return None
-                data = json.loads(resp.read().decode("utf-8", "ignore"))
-            record = None
-            if isinstance(data, list) and data:
-                record = data[0]
-            elif isinstance(data, dict) and data.get("syncedLyrics") or data.get("plainLyrics"):
-                record = data
-            if record:
-                text = record.get("syncedLyrics") or record.get("plainLyrics")
-                if text:
-                    self.last_lyrics_source = "LRCLib"
-                    return text
-        except Exception:
-            return None
-        return None
+    ) -> tuple[Optional[str], str, bool]:
+        """Consulta APIs publicas sin cookies. Devuelve (texto, fuente, hubo_error_de_red)."""
+        providers = public_providers(title, artist, album, duration)
+        if self.race_lyrics:
+            return await self._race_public_lyrics(providers)
+        failed = False
+        for source, url, parser in providers:
+            try:
+                lyrics = await self.fetch_public(url, parser)
+            except Exception as exc:  # noqa: BLE001
+                failed = failed or is_transient_error(exc)
+                continue
+            if lyrics:
+                return (lyrics, source, failed)
+        return (None, "", failed)
 
-    @staticmethod
-    def _duration_to_seconds(duration: Optional[str]) -> Optional[int]:
-        """Convierte 'MM:SS' o 'H:MM:SS' a segundos."""
-        if not duration:
-            return None
-        try:
-            parts = [int(p) for p in duration.split(":")]
-            if len(parts) == 2:
-                m, s = parts
-                return m * 60 + s
-            if len(parts) == 3:
-                h, m, s = parts
-                return h * 3600 + m * 60 + s
-        except Exception:
-            return None
-        return None
+    async def _race_public_lyrics(self, providers: list[LyricsProvider]) -> tuple[Optional[str], str, bool]:
+        """Lanza todos los proveedores a la vez y devuelve la mejor respuesta disponible.
 
-    def _get_lyrist_lyrics(self, title: str, artist: str) -> Optional[str]:
+        Preferencia: letra sincronizada (LRC) > plana, y a igualdad el orden de providers.
+        Una LRC se devuelve apenas llega; con una plana se espera lyrics_grace por algo mejor.
+        Los proveedores que siguen corriendo se cancelan (se cierra su socket).
+        """
+        tasks = {
+            asyncio.create_task(self.fetch_public(url, parser)): (rank, source)
+            for rank, (source, url, parser) in enumerate(providers)
+        }
+        pending = set(tasks)
+        best: Optional[tuple[tuple[int, int], str, str]] = None
+        deadline: Optional[float] = None
+        failed = False
         try:
-            url = f"https://lyrist.vercel.app/api/lyrics/{quote_plus(artist)}/{quote_plus(title)}"
-            with urlopen(url, timeout=8) as resp:
-                if resp.status != 200:
-                    return None
-                data = json.loads(resp.read().decode("utf-8", "ignore"))
-            if isinstance(data, dict):
-                text = data.get("lyrics")
-                if text:
-                    self.last_lyrics_source = "Lyrist API"
-                    return text
-        except Exception:
-            return None
-        return None
+            while pending:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    break
+                for task in done:
+                    try:
+                        text = task.result()
+                    except Exception as exc:  # noqa: BLE001
+                        failed = failed or is_transient_error(exc)
+                        continue
+                    if not text:
+                        continue
+                    rank, source = tasks[task]
+                    score = lyrics_score(text, rank)
+                    if best is None or score < best[0]:
+                        best = (score, source, text)
+                if best and best[0][0] == 0:
+                    break
+                if best and deadline is None:
+                    deadline = time.monotonic() + self.lyrics_grace
+        finally:
+            for task in pending:
+                task.cancel()
+        if not best:
+            return (None, "", failed)
+        return (best[2], best[1], failed)
 
-    def _get_lyrics_ovh(self, title: str, artist: str) -> Optional[str]:
-        try:
-            url = f"https://api.lyrics.ovh/v1/{quote_plus(artist)}/{quote_plus(title)}"
-            with urlopen(url, timeout=8) as resp:
-                if resp.status != 200:
-                    return None
-                data = json.loads(resp.read().decode("utf-8", "ignore"))
-            if isinstance(data, dict):
-                text = data.get("lyrics")
-                if text:
-                    self.last_lyrics_source = "lyrics.ovh"
-                    return text
-        except Exception:
-            return None
-        return None
+    async def aclose(self) -> None:
+        """Cierra sesiones HTTP y descarta llamadas bloqueantes en cola."""
+        await self._http.aclose()
+        self._executor.shutdown(wait=False, cancel_futures=True)
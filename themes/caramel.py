@@ -86,6 +86,23 @@ Screen {
     padding: 0 0 0 1;
     color: #c49a85;
 }
+#eq-band-controls {
+    height: 3;
+    margin: 0 0 1 0;
+}
+#eq-band-controls Select {
+    width: 14;
+    margin: 0 1 0 0;
+}
+#eq-band-controls Button {
+    width: 9;
+    height: 3;
+    margin: 0 1 0 0;
+}
+#eq-band-label {
+    padding: 1 0 0 1;
+    color: #c49a85;
+}
 #lyrics-text {
     height: 1fr;
     border: solid #3b1a1a;
@@ -186,6 +203,16 @@ Screen {
     padding: 0 1;
     border: solid #f2a65a;
 }
+#visualizer.-beat {
+    border: heavy #f2a65a;
+}
+#spectrum {
+    height: 3;
+    display: none;
+    background: #2e1717;
+    padding: 0 1;
+    color: #f2a65a;
+}
 #progress-block {
     padding: 0 0 1 0;
     height: 3;
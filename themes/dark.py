@@ -78,6 +78,23 @@ Screen {
     padding: 0 0 0 1;
     color: #9ca3af;
 }
+#eq-band-controls {
+    height: 3;
+    margin: 0 0 1 0;
+}
+#eq-band-controls Select {
+    width: 14;
+    margin: 0 1 0 0;
+}
+#eq-band-controls Button {
+    width: 9;
+    height: 3;
+    margin: 0 1 0 0;
+}
+#eq-band-label {
+    padding: 1 0 0 1;
+    color: #9ca3af;
+}
 #lyrics-table {
     width: 100%;
     height: 1fr;
@@ -205,6 +222,16 @@ Screen {
     padding: 0 1;
     border: solid #22d3ee;
 }
+#visualizer.-beat {
+    border: heavy #22d3ee;
+}
+#spectrum {
+    height: 3;
+    display: none;
+    background: #111827;
+    padding: 0 1;
+    color: #22d3ee;
+}
 #progress-block {
     padding: 0 0 1 0;
     height: 3;
@@ -86,6 +86,23 @@ Screen {
     padding: 0 0 0 1;
     color: #9ea0b4;
 }
+#eq-band-controls {
+    height: 3;
+    margin: 0 0 1 0;
+}
+#eq-band-controls Select {
+    width: 14;
+    margin: 0 1 0 0;
+}
+#eq-band-controls Button {
+    width: 9;
+    height: 3;
+    margin: 0 1 0 0;
+}
+#eq-band-label {
+    padding: 1 0 0 1;
+    color: #9ea0b4;
+}
 #lyrics-text {
     height: 1fr;
     border: solid #44475a;
@@ -186,6 +203,16 @@ Screen {
     padding: 0 1;
     border: solid #ff79c6;
 }
+#visualizer.-beat {
+    border: heavy #ff79c6;
+}
+#spectrum {
+    height: 3;
+    display: none;
+    background: #1e1f29;
+    padding: 0 1;
+    color: #ff79c6;
+}
 #progress-block {
     padding: 0 0 1 0;
     height: 3;
@@ -86,6 +86,23 @@ Screen {
     padding: 0 0 0 1;
     color: #4b5563;
 }
+#eq-band-controls {
+    height: 3;
+    margin: 0 0 1 0;
+}
+#eq-band-controls Select {
+    width: 14;
+    margin: 0 1 0 0;
+}
+#eq-band-controls Button {
+    width: 9;
+    height: 3;
+    margin: 0 1 0 0;
+}
+#eq-band-label {
+    padding: 1 0 0 1;
+    color: #4b5563;
+}
 #lyrics-text {
     height: 1fr;
     border: solid #e5e7eb;
@@ -186,6 +203,16 @@ Screen {
     padding: 0 1;
     border: solid #3b82f6;
 }
+#visualizer.-beat {
+    border: heavy #3b82f6;
+}
+#spectrum {
+    height: 3;
+    display: none;
+    background: #f8fafc;
+    padding: 0 1;
+    color: #3b82f6;
+}
 #progress-block {
     padding: 0 0 1 0;
     height: 3;
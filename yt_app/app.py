@@ -1,8 +1,8 @@
 import asyncio
 import os
 import re
-from pathlib import Path
-from typing import List, Optional, Any
+import time
+from typing import List, Optional, Any, Sequence
 
 from textual import on
 from textual import events
@@ -25,10 +25,18 @@ from textual.widgets import (
 )
 from textual_image.widget import AutoImage as TImage
 
+from modules.audio_cache import AudioCache
+from modules.cache import SqliteCache, default_cache_dir
+from modules.cover_cache import CoverCache
+from modules.loudness import LoudnessAnalyzer
+from modules.metrics import Metrics
 from modules.models import SearchResult
-from modules.player import MPVController
+from modules.player import EQ_BANDS_HZ, EQ_CUSTOM_PRESET, MPVController, eq_preset_gains
+from modules.ringbuffer import RingBuffer
+from modules.scheduler import RefreshScheduler
+from modules.stream_resolver import StreamResolver
 from modules.visualizer import Visualizer
-from modules.yt_client import YouTubeMusicClient
+from modules.yt_client import AsyncYouTubeMusicClient, YouTubeMusicClient
 from themes import get_theme_css
 from yt_app.cover import CoverMixin
 from yt_app.playback import PlaybackMixin
@@ -36,6 +44,10 @@ from yt_app.search import SearchMixin
 from yt_app.theme import ThemeMixin
 
 
+def _band_label(hz: int) -> str:
+    return f"{hz // 1000} kHz" if hz >= 1000 else f"{hz} Hz"
+
+
 class LyricsTable(DataTable):
     """Tabla de solo lectura para letras."""
 
@@ -58,6 +70,26 @@ class LyricsTable(DataTable):
         event.prevent_default()
 
 
+class SpectrumBars(Static):
+    """Barras verticales por banda (0-1) con marca de pico, dibujadas con bloques unicode."""
+
+    _LEVELS = " ▁▂▃▄▅▆▇█"
+
+    def show_bands(self, bands: Sequence[float], peaks: Sequence[float]) -> None:
+        rows = max(1, self.content_size.height or 3)
+        lines = []
+        for row in range(rows - 1, -1, -1):
+            cells = []
+            for value, peak in zip(bands, peaks):
+                fill = min(1.0, max(0.0, value * rows - row))
+                if fill <= 0.0 and row == min(rows - 1, int(peak * rows)) and peak > 0.02:
+                    cells.append("▔")
+                else:
+                    cells.append(self._LEVELS[round(fill * 8)])
+            lines.append("".join(cells))
+        self.update("\n".join(lines))
+
+
 class YouTubeMusicSearch(
     ThemeMixin,
     CoverMixin,
@@ -88,33 +120,81 @@ class YouTubeMusicSearch(
     ]
 
     def __init__(self) -> None:
+        self._started_at = time.perf_counter()
         super().__init__()
-        # Intenta usar cookies automaticamente si existen.
-        detected = self._find_cookies_file()
-        self._cookies_path: Optional[str] = str(detected) if detected else None
-        self.ytmusic = YouTubeMusicClient(self._cookies_path)
-        self.player = MPVController()
-        self.visualizer = Visualizer(mpv_player=self.player._player)
+        self.metrics = Metrics()
+        # YTMusic (cookies incluidas), libmpv y la captura de audio se inician en segundo
+        # plano despues del primer frame; ver _init_backends.
+        self.ytmusic = YouTubeMusicClient()
+        self.ytmusic_async = AsyncYouTubeMusicClient(self.ytmusic)
+        self.stream_resolver = StreamResolver(metrics=self.metrics)
+        self.audio_cache = AudioCache(metrics=self.metrics)
+        self.cover_cache = CoverCache(metrics=self.metrics)
+        # Ganancia de loudness por pista: se mide al completarse cada descarga del cache.
+        self.loudness = LoudnessAnalyzer(self.audio_cache, metrics=self.metrics)
+        # BPM estimado por el visualizador, guardado por video_id (para ordenar colas).
+        self.tempo_store = SqliteCache("tempo", ttl=365 * 24 * 3600, max_entries=5000)
+        self.audio_cache.on_cached = self.loudness.analyze
+        self.player = MPVController(
+            autostart=False,
+            resolver=self.stream_resolver,
+            metrics=self.metrics,
+            audio_cache=self.audio_cache,
+        )
+        self._resolve_task: Optional[asyncio.Task] = None
+        # Play pedido mientras mpv todavia inicia (se reemplaza si llega otro).
+        self._pending_play_task: Optional[asyncio.Task] = None
+        # Todo el trabajo periodico de la UI pasa por el scheduler (ver _wake_scheduler).
+        self.scheduler = RefreshScheduler(self.metrics)
+        self._refresh_timer = None
+        self._visualizer_interval: float = 0.1
+        self._progress_interval: float = 0.25
+        self._background_interval: float = 1.0
+        self._app_focused: bool = True
+        # El analisis corre al ritmo de refresco del visualizador, no del audio; arranca
+        # apagado y _wake_scheduler lo sube cuando empieza a sonar algo.
+        self.visualizer = Visualizer(analysis_rate=0.0)
+        self._backends_task: Optional[asyncio.Task] = None
         self._current_worker: Optional[asyncio.Task] = None
         self._last_results: List[SearchResult] = []
+        self._search_limit: int = 100
         self._current: Optional[SearchResult] = None
         self._current_index: Optional[int] = None
         self._is_playing: bool = False
-        self._visualizer_timer = None
-        self._progress_timer = None
         self._volume: int = 50
         self._seek_step: int = 5
         self._visual_phase: float = 0.0
         self._audio_devices: list[tuple[str, str]] = []
         self._selected_device: Optional[str] = None
-        self._spark_data: List[float] = []
+        # El sparkline muestra una vista de visualizer.history (el mismo ring del productor);
+        # este ring propio solo se llena con el fallback sin audio real (sample_energy).
+        self._spark_data = RingBuffer(1024)
+        self._spark_width: int = 80
+        # visualizer.history.written al reiniciar el sparkline: lo anterior no se muestra.
+        self._spark_start: int = 0
+        self._beat_count: int = 0
+        self._stored_bpm: Optional[float] = None
+        self._tempo_task: Optional[asyncio.Task] = None
         self._cover_task: Optional[asyncio.Task] = None
+        self._cover_text_task: Optional[asyncio.Task] = None
+        self._prefetch_task: Optional[asyncio.Task] = None
+        self._cover_inflight: dict[str, asyncio.Task] = {}
+        self._cover_fetching: set[str] = set()
+        self._prefetch_downloads: set[asyncio.Task] = set()
+        self._prefetch_slots = asyncio.Semaphore(2)
+        self._cover_idle = asyncio.Event()
+        self._cover_idle.set()
         self._theme_name: str = "mini"
         self._auto_continue: bool = False
+        self._gapless: bool = True
+        self._gapless_lead: float = 15.0
+        self._queued_item: Optional[SearchResult] = None
         self._lyrics_task: Optional[asyncio.Task] = None
         self._lyrics_video_id: Optional[str] = None
         self._normalize_volume: bool = True
         self._eq_preset: str = "plano"
+        self._eq_gains: List[float] = eq_preset_gains("plano")
+        self._eq_band: int = 0
         self._lyrics_lines: List[str] = []
         self._synced_lyrics: List[dict[str, Any]] = []
         self._synced_lyrics_base: List[dict[str, Any]] = []
@@ -162,6 +242,7 @@ class YouTubeMusicSearch(
                                 yield Button("Vol -", id="vol-down", variant="default")
                                 yield Button("Vol +", id="vol-up", variant="default")
                             yield Sparkline(id="visualizer")
+                            yield SpectrumBars("", id="spectrum")
                     with TabPane("Opciones", id="options-tab"):
                         with Container(id="options-content"):
                             yield Static("Ajustes de reproduccion", id="options-title")
@@ -173,13 +254,27 @@ class YouTubeMusicSearch(
                                     ("Jazz", "jazz"),
                                     ("House", "house"),
                                     ("Techno", "techno"),
+                                    ("Personalizado", EQ_CUSTOM_PRESET),
                                 ],
                                 id="eq-select",
                                 prompt="Ecualizador",
                                 value="plano",
                             )
+                            with Horizontal(id="eq-band-controls"):
+                                yield Select(
+                                    options=[(_band_label(hz), i) for i, hz in enumerate(EQ_BANDS_HZ)],
+                                    id="eq-band-select",
+                                    prompt="Banda",
+                                    value=0,
+                                    allow_blank=False,
+                                )
+                                yield Button("-1 dB", id="eq-gain-down", variant="default")
+                                yield Button("+1 dB", id="eq-gain-up", variant="default")
+                                yield Static("", id="eq-band-label")
                             yield Checkbox("Continuar", id="auto-continue", value=False)
+                            yield Checkbox("Sin cortes", id="gapless", value=True)
                             yield Checkbox("Normalizar", id="normalize", value=True)
+                            yield Static("", id="cache-stats")
                     with TabPane("Letras", id="lyrics-tab"):
                         with Container(id="lyrics-content"):
                             yield LoadingIndicator(id="lyrics-loading")
@@ -195,22 +290,21 @@ class YouTubeMusicSearch(
         table = self.query_one(DataTable)
         table.add_columns("Titulo", "Artista", "Album", "Duracion")
         self.query_one(Input).focus()
-        self._visualizer_timer = self.set_interval(0.2, self._tick_visualizer, pause=True)
-        self._progress_timer = self.set_interval(0.5, self._tick_progress, pause=False)
-        if not self.player.available and self.player.last_error:
-            self._set_status(self.player.last_error)
+        self.scheduler.add("visualizer", self._tick_visualizer, self._visualizer_refresh_interval)
+        # El progreso lee un snapshot local (observers de mpv): se puede refrescar seguido.
+        self.scheduler.add("progress", self._tick_progress, self._progress_refresh_interval)
         self._update_volume_display()
         self._reset_lyrics()
         try:
-            self.player.set_end_callback(lambda: self.call_from_thread(self._handle_track_end))
+            self.query_one("#auto-continue", Checkbox).value = self._auto_continue
         except Exception:
             pass
         try:
-            self.query_one("#auto-continue", Checkbox).value = self._auto_continue
+            self.query_one("#normalize", Checkbox).value = self._normalize_volume
         except Exception:
             pass
         try:
-            self.query_one("#normalize", Checkbox).value = self._normalize_volume
+            self.query_one("#gapless", Checkbox).value = self._gapless
         except Exception:
             pass
         try:
@@ -218,13 +312,62 @@ class YouTubeMusicSearch(
             eq_select.value = self._eq_preset
         except Exception:
             pass
-        self._apply_filters()
+        self._update_eq_label()
+        self._init_lyrics_table()
+        self.metrics.record("ui", time.perf_counter() - self._started_at)
+        self._backends_task = asyncio.create_task(self._init_backends())
+
+    async def _init_backends(self) -> None:
+        """Inicia YTMusic, mpv y el visualizador en hilos sin bloquear la UI."""
+
+        def timed(name: str, fn) -> None:  # type: ignore[no-untyped-def]
+            with self.metrics.time(name):
+                fn()
+
+        ytmusic_ready = asyncio.create_task(asyncio.to_thread(timed, "ytmusic", self.ytmusic.warm_up))
+        resolver_ready = asyncio.create_task(asyncio.to_thread(self.stream_resolver.warm_up))
+        await asyncio.to_thread(timed, "mpv", self.player.start)
+        self._on_player_ready()
+        self.visualizer.mpv_player = self.player._player
+        if self.player.has_level_meter:
+            self.visualizer.level_source = self.player.sample_levels
         try:
-            self.visualizer.start()
+            await asyncio.to_thread(timed, "visualizador", self.visualizer.start)
         except Exception as exc:  # noqa: BLE001
             self._set_status(f"Visualizador en fallback: {exc}")
+        try:
+            await ytmusic_ready
+        except Exception as exc:  # noqa: BLE001
+            self._set_status(f"YouTube Music no disponible: {exc}")
+            return
+        try:
+            await resolver_ready
+        except Exception:
+            pass
+        self.metrics.record("total", time.perf_counter() - self._started_at)
+        self._report_startup()
+        # Pistas cacheadas en sesiones anteriores que todavia no tienen medicion.
+        await asyncio.to_thread(self.loudness.analyze_batch)
+
+    def _on_player_ready(self) -> None:
+        if not self.player.available and self.player.last_error:
+            self._set_status(self.player.last_error)
+        try:
+            self.player.set_end_callback(lambda: self.call_from_thread(self._handle_track_end))
+            self.player.set_advance_callback(
+                lambda video_id: self.call_from_thread(self._handle_track_advanced, video_id)
+            )
+        except Exception:
+            pass
+        self._apply_filters()
         self._load_audio_devices()
-        self._init_lyrics_table()
+
+    def _report_startup(self) -> None:
+        """Muestra y guarda (startup.log, JSON por linea) los tiempos de arranque."""
+        summary = self.metrics.summary(["ui", "ytmusic", "mpv", "visualizador", "resolver_warmup", "total"])
+        self.metrics.append_report(default_cache_dir() / "startup.log", event="startup")
+        if not self._current:
+            self._set_status(f"Listo. Inicio: {summary}")
 
     def _load_audio_devices(self) -> None:
         select = self.query_one("#audio-select", Select)
@@ -253,13 +396,10 @@ class YouTubeMusicSearch(
         if not self.player.available:
             return
         try:
-            self.player.set_filters(self._normalize_volume, self._eq_preset)
+            self.player.set_filters(self._normalize_volume, self._eq_preset, self._eq_gains)
         except Exception as exc:  # noqa: BLE001
             self._set_status(f"Error al ajustar filtros: {exc}")
 
-    def _find_cookies_file(self) -> Optional[Path]:
-        return YouTubeMusicClient._discover_cookies()
-
     def _init_lyrics_table(self) -> None:
         table = self._get_lyrics_table()
         if not table:
@@ -365,8 +505,7 @@ class YouTubeMusicSearch(
     async def _load_lyrics_async(self, item: SearchResult) -> None:
         task = asyncio.current_task()
         try:
-            lyrics = await asyncio.to_thread(
-                self.ytmusic.get_song_lyrics,
+            lyrics = await self.ytmusic_async.get_song_lyrics(
                 item.video_id,
                 item.title,
                 item.artist,
@@ -377,7 +516,7 @@ class YouTubeMusicSearch(
                 return
             if lyrics:
                 self._set_lyrics_text(lyrics)
-                source = getattr(self.ytmusic, "last_lyrics_source", "") or ""
+                source = self.ytmusic_async.last_lyrics_source
                 status_msg = f"Letra cargada ({source})." if source else "Letra cargada."
                 self._set_lyrics_status(status_msg)
             else:
@@ -578,12 +717,23 @@ class YouTubeMusicSearch(
         """Evita que clicks en la tabla de letras rompan el foco/estado."""
         event.stop()
 
-    def on_unmount(self) -> None:
+    async def on_unmount(self) -> None:
+        if self._backends_task:
+            self._backends_task.cancel()
+        self.stream_resolver.close()
+        self.audio_cache.close()
+        self.loudness.close()
+        self._cancel_cover_prefetch()
+        self.cover_cache.close()
         try:
             self.visualizer.stop()
         except Exception:
             pass
         self._update_play_button()
+        try:
+            await self.ytmusic_async.aclose()
+        except Exception:
+            pass
 
     @on(Select.Changed, "#audio-select")
     def _on_audio_changed(self, event: Select.Changed) -> None:
@@ -609,6 +759,18 @@ class YouTubeMusicSearch(
     async def _on_input_submitted(self, _: Input.Submitted) -> None:
         await self.action_search()
 
+    def on_app_focus(self, _: events.AppFocus) -> None:
+        self._app_focused = True
+        self._wake_scheduler()
+
+    def on_app_blur(self, _: events.AppBlur) -> None:
+        self._app_focused = False
+        self._wake_scheduler()
+
+    @on(TabbedContent.TabActivated, "#right-tabs")
+    def _on_right_tab_changed(self, _: TabbedContent.TabActivated) -> None:
+        self._wake_scheduler()
+
     @on(Button.Pressed, "#search-btn")
     async def _on_search_button(self, _: Button.Pressed) -> None:
         await self.action_search()
@@ -618,6 +780,10 @@ class YouTubeMusicSearch(
         self.action_play_selected()
         self._current_index = event.cursor_row
 
+    @on(DataTable.RowHighlighted, "#results")
+    def _on_row_highlighted(self, _: DataTable.RowHighlighted) -> None:
+        self._schedule_cover_prefetch()
+
     @on(Button.Pressed, "#vol-up")
     def _on_vol_up(self, _: Button.Pressed) -> None:
         self.action_vol_up()
@@ -639,9 +805,54 @@ class YouTubeMusicSearch(
         if not isinstance(value, str):
             return
         self._eq_preset = value
+        if value != EQ_CUSTOM_PRESET:
+            self._eq_gains = eq_preset_gains(value)
         self._apply_filters()
+        self._update_eq_label()
         self._set_status(f"Ecualizador: {value}")
 
+    @on(Select.Changed, "#eq-band-select")
+    def _on_eq_band_changed(self, event: Select.Changed) -> None:
+        if isinstance(event.value, int):
+            self._eq_band = event.value
+            self._update_eq_label()
+
+    @on(Button.Pressed, "#eq-gain-down")
+    def _on_eq_gain_down(self, _: Button.Pressed) -> None:
+        self._adjust_eq_band(-1.0)
+
+    @on(Button.Pressed, "#eq-gain-up")
+    def _on_eq_gain_up(self, _: Button.Pressed) -> None:
+        self._adjust_eq_band(1.0)
+
+    def _adjust_eq_band(self, delta: float) -> None:
+        """Mueve una banda del EQ en vivo (af-command) y pasa a preset personalizado."""
+        if not self.player.available:
+            return
+        try:
+            self.player.set_band_gain(self._eq_band, self._eq_gains[self._eq_band] + delta)
+        except Exception as exc:  # noqa: BLE001
+            self._set_status(f"Error al ajustar filtros: {exc}")
+            return
+        self._eq_gains = self.player.eq_gains
+        if self._eq_preset != EQ_CUSTOM_PRESET:
+            self._eq_preset = EQ_CUSTOM_PRESET
+            try:
+                with self.prevent(Select.Changed):
+                    self.query_one("#eq-select", Select).value = EQ_CUSTOM_PRESET
+            except Exception:
+                pass
+        self._update_eq_label()
+
+    def _update_eq_label(self) -> None:
+        hz = EQ_BANDS_HZ[self._eq_band]
+        try:
+            self.query_one("#eq-band-label", Static).update(
+                f"{_band_label(hz)}: {self._eq_gains[self._eq_band]:+.0f} dB"
+            )
+        except Exception:
+            pass
+
     @on(Button.Pressed, "#seek-forward")
     def _on_seek_forward_btn(self, _: Button.Pressed) -> None:
         self.action_seek_forward()
@@ -669,8 +880,18 @@ class YouTubeMusicSearch(
     @on(Checkbox.Changed, "#auto-continue")
     def _on_auto_continue_changed(self, event: Checkbox.Changed) -> None:
         self._auto_continue = bool(event.value)
+        if not self._auto_continue:
+            self._cancel_queued()
         msg = "Continuar auto: on" if self._auto_continue else "Continuar auto: off"
         self._set_status(msg)
 
+    @on(Checkbox.Changed, "#gapless")
+    def _on_gapless_changed(self, event: Checkbox.Changed) -> None:
+        self._gapless = bool(event.value)
+        if not self._gapless:
+            self._cancel_queued()
+        msg = "Sin cortes: on" if self._gapless else "Sin cortes: off"
+        self._set_status(msg)
+
 
 __all__ = ["YouTubeMusicSearch"]
@@ -1,36 +1,73 @@
 import asyncio
-import io
-from typing import Optional
+from functools import partial
+from typing import List, Optional
 
-import requests
 from PIL import Image as PILImage
-from textual.widgets import Static
+from textual.widgets import DataTable, Static
 from textual.widgets._loading_indicator import LoadingIndicator
 from textual_image.widget import AutoImage as TImage
 
+from modules.cover_cache import CoverCache, cover_key
+from modules.http_client import get_async_http_client
+from modules.metrics import Metrics
 from modules.models import SearchResult
+from modules.thumbnails import thumbnail_url_for
 
 
 class CoverMixin:
     """Carga y fallback de caratulas."""
 
     _cover_task: asyncio.Task | None
+    _cover_text_task: asyncio.Task | None
+    _prefetch_task: asyncio.Task | None
+    # Descargas en curso por clave de cover (las comparten prefetch y play).
+    _cover_inflight: dict[str, asyncio.Task]
+    _cover_fetching: set[str]
+    _prefetch_downloads: set[asyncio.Task]
+    _prefetch_slots: asyncio.Semaphore
+    # Seteado mientras no hay una cover en primer plano cargando.
+    _cover_idle: asyncio.Event
+    _last_results: List[SearchResult]
+    cover_cache: CoverCache
+    metrics: Metrics
+    # Prefetch: espera antes de arrancar (deja pasar render/scroll) y filas alrededor del
+    # cursor ademas de las visibles. Las descargas simultaneas las limita _prefetch_slots.
+    _prefetch_delay: float = 0.4
+    _prefetch_around: int = 5
 
     def _load_cover(self, item: SearchResult) -> None:
         if self._cover_task:
             self._cover_task.cancel()
+            self._cover_task = None
+        self._cover_idle.set()
         if not item.thumbnail_url:
             self._reset_cover()
             return
+        key = cover_key(item.video_id, item.thumbnail_url)
+        # Solo memoria en el loop; el disco se lee en el pool (ver _load_cover_async).
+        cached = self.cover_cache.peek(key)
+        if cached is not None:
+            # Hit: se muestra en el mismo frame que el texto de "ahora suena".
+            self._set_cover_loading(False)
+            self._update_cover_widget(cached, key)
+            return
         self._set_status("Cargando cover...")
         self._set_cover_loading(True)
-        self._cover_task = asyncio.create_task(self._load_cover_async(item.thumbnail_url))
+        # Pedir la variante mas chica que cubre el tamaño de la cache (no la mas grande).
+        url = thumbnail_url_for(item, self.cover_cache.size)
+        self._cover_idle.clear()
+        self._cover_task = asyncio.create_task(self._load_cover_async(url, key))
 
-    async def _load_cover_async(self, url: str) -> None:
+    async def _load_cover_async(self, url: str, key: str) -> None:
         task = asyncio.current_task()
         try:
-            data = await asyncio.to_thread(self._fetch_image_bytes, url)
-            self._update_cover_widget(data)
+            image = await self.cover_cache.get_async(key)
+            if image is None:
+                # Si el prefetch ya la esta bajando se espera esa misma descarga.
+                download = self._cover_download(url, key)
+                self._prefetch_downloads.discard(download)
+                image = await asyncio.shield(download)
+            self._update_cover_widget(image, key)
             self._set_status("Cover cargada")
         except asyncio.CancelledError:
             return
@@ -39,34 +76,119 @@ class CoverMixin:
         finally:
             if self._cover_task is task:
                 self._cover_task = None
+                self._cover_idle.set()
             self._set_cover_loading(False)
 
-    @staticmethod
-    def _fetch_image_bytes(url: str) -> bytes:
-        resp = requests.get(url, timeout=10)
-        resp.raise_for_status()
-        return resp.content
-
-    def _pixelate_to_text(self, data: bytes, max_size: tuple[int, int] = (32, 20)) -> str:
-        """Convierte la imagen a un pequeño ascii-art para fallback."""
-        with PILImage.open(io.BytesIO(data)) as img:
-            img = img.convert("RGB")
-            img.thumbnail(max_size)
-            palette = " .:-=+*#%@"
-            width, height = img.size
-            lines = []
-            for y in range(height):
-                row = []
-                for x in range(width):
-                    pixel = img.getpixel((x, y))
-                    if isinstance(pixel, tuple):
-                        r, g, b = pixel[:3]
-                    else:
-                        r = g = b = float(pixel)
-                    lum = (0.299 * r + 0.587 * g + 0.114 * b) / 255
-                    row.append(palette[min(len(palette) - 1, int(lum * (len(palette) - 1)))])
-                lines.append("".join(row))
-            return "\n".join(lines) if lines else "Sin cover"
+    def _cover_download(self, url: str, key: str, background: bool = False) -> asyncio.Task:
+        """Tarea que baja y cachea la cover `key`; reutiliza la que ya este en curso.
+
+        Una precarga que todavia espera turno no se reutiliza para la cover pedida en
+        primer plano: se cancela y se baja sin esperar.
+        """
+        task = self._cover_inflight.get(key)
+        queued = task in self._prefetch_downloads and key not in self._cover_fetching
+        if task is not None and not background and queued:
+            task.cancel()
+            task = None
+        if task is None:
+            task = asyncio.create_task(self._download_cover(url, key, background))
+            self._cover_inflight[key] = task
+            if background:
+                self._prefetch_downloads.add(task)
+            task.add_done_callback(partial(self._forget_cover_download, key))
+        return task
+
+    def _forget_cover_download(self, key: str, task: asyncio.Task) -> None:
+        self._prefetch_downloads.discard(task)
+        if self._cover_inflight.get(key) is task:
+            del self._cover_inflight[key]
+
+    async def _download_cover(self, url: str, key: str, background: bool) -> PILImage.Image:
+        if not background:
+            return await self._fetch_cover(url, key)
+        # Baja prioridad: pocas a la vez y nunca mientras carga la cover en primer plano.
+        async with self._prefetch_slots:
+            await self._cover_idle.wait()
+            return await self._fetch_cover(url, key)
+
+    async def _fetch_cover(self, url: str, key: str) -> PILImage.Image:
+        """Descarga, prepara (en el pool: el loop solo asigna) y guarda en la cache."""
+        self._cover_fetching.add(key)
+        try:
+            with self.metrics.time("cover_download"):
+                data = await get_async_http_client().get_bytes(url, timeout=10)
+            image = await self.cover_cache.prepare_async(data)
+        finally:
+            self._cover_fetching.discard(key)
+        self.cover_cache.put(key, image)
+        return image
+
+    def _schedule_cover_prefetch(self) -> None:
+        """(Re)agenda el prefetch de covers para las filas visibles y cercanas al cursor.
+
+        Las descargas ya lanzadas siguen: el nuevo pase las reutiliza por clave.
+        """
+        if self._prefetch_task:
+            self._prefetch_task.cancel()
+            self._prefetch_task = None
+        if self._last_results:
+            self._prefetch_task = asyncio.create_task(self._prefetch_covers())
+
+    def _cancel_cover_prefetch(self) -> None:
+        """Corta el prefetch y sus descargas (salvo la que espera la cover en primer plano)."""
+        if self._prefetch_task:
+            self._prefetch_task.cancel()
+            self._prefetch_task = None
+        for task in list(self._prefetch_downloads):
+            task.cancel()
+        self._prefetch_downloads.clear()
+
+    def _prefetch_rows(self) -> list[int]:
+        """Indices a precargar: primero alrededor del cursor, despues el resto de lo visible."""
+        try:
+            table = self.query_one("#results", DataTable)
+        except Exception:
+            return []
+        count = min(table.row_count, len(self._last_results))
+        if count == 0:
+            return []
+        cursor = table.cursor_row if table.cursor_row is not None else 0
+        top = int(table.scroll_y)
+        visible = range(top, min(count, top + max(1, table.size.height)))
+        near = sorted(
+            range(max(0, cursor - self._prefetch_around), min(count, cursor + self._prefetch_around + 1)),
+            key=lambda i: abs(i - cursor),
+        )
+        return list(dict.fromkeys([*near, *visible]))
+
+    async def _prefetch_covers(self) -> None:
+        """Calienta la cache de covers con baja prioridad (no compite con la cover en curso)."""
+        task = asyncio.current_task()
+        try:
+            await asyncio.sleep(self._prefetch_delay)
+            results = self._last_results
+            pending: list[tuple[str, str]] = []
+            for index in self._prefetch_rows():
+                item = results[index]
+                if not item.thumbnail_url:
+                    continue
+                key = cover_key(item.video_id, item.thumbnail_url)
+                if not self.cover_cache.contains(key):
+                    pending.append((thumbnail_url_for(item, self.cover_cache.size), key))
+            downloads = [self._cover_download(url, key, background=True) for url, key in pending]
+            if not downloads:
+                return
+            # asyncio.wait no cancela las descargas si este pase se reemplaza.
+            await asyncio.wait(downloads)
+            for download in downloads:
+                if download.cancelled():
+                    continue
+                self.metrics.incr("cover_prefetch_error" if download.exception() else "cover_prefetch")
+        except asyncio.CancelledError:
+            return
+        finally:
+            if self._prefetch_task is task:
+                self._prefetch_task = None
 
     def _get_cover_status_widget(self) -> Optional[Static]:
         try:
@@ -92,35 +214,49 @@ class CoverMixin:
             except Exception:
                 pass
 
-    def _update_cover_widget(self, data: bytes) -> None:
-        status = self._get_cover_status_widget()
-        try:
-            image = PILImage.open(io.BytesIO(data))
-            image.load()
-            image = self._square_crop(image)
-            image.thumbnail((256, 256))
-        except Exception as exc:  # noqa: BLE001
-            if status:
-                status.update(f"Cover error: {exc}")
-            self._set_status(f"Cover error: {exc}")
-            return
+    def _cover_text_cells(self, status: Static) -> tuple[int, int]:
+        """Celdas disponibles para el fallback de texto (o el tamaño por defecto del cache)."""
+        width, height = status.content_size
+        if width > 0 and height > 0:
+            return width, height
+        return self.cover_cache.text_cells
+
+    def _cancel_cover_text(self) -> None:
+        if self._cover_text_task:
+            self._cover_text_task.cancel()
+            self._cover_text_task = None
 
+    def _update_cover_widget(self, image: PILImage.Image, key: str) -> None:
+        self._cancel_cover_text()
+        status = self._get_cover_status_widget()
         try:
             cover = self.query_one("#cover", TImage)
             cover.image = image
             if status:
                 status.update("")
         except Exception as exc:
-            message = None
+            # textual_image no puede dibujar: fallback en medios bloques, armado en el pool.
             if status:
-                try:
-                    message = self._pixelate_to_text(data)
-                except Exception as inner_exc:  # noqa: BLE001
-                    message = f"Cover error: {inner_exc}"
-                status.update(message)
+                cells = self._cover_text_cells(status)
+                self._cover_text_task = asyncio.create_task(self._show_cover_text(status, image, key, cells))
             self._set_status(f"Cover error: {exc}")
 
+    async def _show_cover_text(
+        self, status: Static, image: PILImage.Image, key: str, cells: tuple[int, int]
+    ) -> None:
+        task = asyncio.current_task()
+        try:
+            message = await self.cover_cache.render_text_async(key, image, cells)
+        except asyncio.CancelledError:
+            return
+        except Exception as exc:  # noqa: BLE001
+            message = f"Cover error: {exc}"
+        if self._cover_text_task is task:
+            self._cover_text_task = None
+            status.update(message)
+
     def _reset_cover(self) -> None:
+        self._cancel_cover_text()
         try:
             cover = self.query_one("#cover", TImage)
             cover.image = None
@@ -130,16 +266,3 @@ class CoverMixin:
         if status:
             status.update("Sin cover")
         self._set_cover_loading(False)
-
-    @staticmethod
-    def _square_crop(image: PILImage.Image) -> PILImage.Image:
-        """Recorta la imagen a un cuadrado centrado."""
-        width, height = image.size
-        if width == height:
-            return image
-        side = min(width, height)
-        left = (width - side) // 2
-        top = (height - side) // 2
-        right = left + side
-        bottom = top + side
-        return image.crop((left, top, right, bottom))
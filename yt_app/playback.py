@@ -1,8 +1,12 @@
-from typing import List, Optional
+import asyncio
+from functools import partial
+from typing import Optional
 
-from textual.widgets import Button, DataTable, Input, ProgressBar, Sparkline, Static
+from textual.timer import Timer
+from textual.widgets import Button, DataTable, Input, ProgressBar, Sparkline, Static, TabbedContent
 
 from modules.models import SearchResult
+from modules.ringbuffer import RingBuffer
 
 
 class PlaybackMixin:
@@ -10,13 +14,28 @@ class PlaybackMixin:
 
     _current: Optional[SearchResult]
     _current_index: Optional[int]
-    _spark_data: List[float]
+    _spark_data: RingBuffer
+    _spark_width: int
+    _spark_start: int
+    _beat_count: int
+    _stored_bpm: Optional[float]
     _volume: int
     _seek_step: int
     _is_playing: bool
     _auto_continue: bool
     _synced_lyrics: list[tuple[float, str]]
     _current_lyric_index: int
+    _resolve_task: Optional[asyncio.Task]
+    _pending_play_task: Optional[asyncio.Task]
+    _tempo_task: Optional[asyncio.Task]
+    _gapless: bool
+    _gapless_lead: float
+    _queued_item: Optional[SearchResult]
+    _refresh_timer: Optional[Timer]
+    _visualizer_interval: float
+    _progress_interval: float
+    _background_interval: float
+    _app_focused: bool
 
     def _update_volume_display(self) -> None:
         self.query_one("#volume-display", Static).update(f"Volumen: {self._volume}%")
@@ -85,14 +104,38 @@ class PlaybackMixin:
     def action_stop_button(self) -> None:
         self._stop_playback()
 
-    def _start_playback(self, item: SearchResult, index: Optional[int] = None) -> None:
+    def _start_playback(self, item: SearchResult, index: Optional[int] = None, resolve: bool = True) -> None:
         if not item.url:
             self._set_status("No hay URL para reproducir esta pista.")
             return
+        if not self.player.ready:
+            # mpv sigue iniciando en segundo plano: reintentar apenas este listo.
+            self._set_status("Iniciando mpv...")
+            # Un solo pendiente: otro Play antes de que mpv este listo reemplaza al anterior.
+            if self._pending_play_task:
+                self._pending_play_task.cancel()
+            self._pending_play_task = asyncio.create_task(self._start_playback_when_ready(item, index))
+            return
         if not self.player.available:
             msg = self.player.last_error or "mpv no esta disponible."
             self._set_status(msg)
             return
+        if self._resolve_task:
+            self._resolve_task.cancel()
+            self._resolve_task = None
+        resolver = self.stream_resolver
+        if (
+            resolve
+            and item.video_id
+            and resolver.available
+            and not self.audio_cache.contains(item.video_id)
+            and not resolver.cached(item.video_id)
+            and not resolver.recently_failed(item.video_id)
+        ):
+            # Extraer con el yt-dlp ya caliente es mas rapido que el hook ytdl de mpv.
+            self._set_status(f"Resolviendo \"{item.title}\"...")
+            self._resolve_task = asyncio.create_task(self._resolve_and_play(item, index))
+            return
         if self.player.available and self._current and self._current_index != index:
             try:
                 self.player._player.stop()  # type: ignore[attr-defined]
@@ -100,29 +143,138 @@ class PlaybackMixin:
                 pass
         try:
             self.player.set_volume(self._volume)
-            self.player.play(item.url)
+            gain = self.loudness.gain_for(item.video_id)
+            self.player.play(item.url, video_id=item.video_id, track_gain=gain)
         except Exception as exc:  # noqa: BLE001
             log = self.player.last_log or ""
             self._set_status(f"Error al reproducir: {exc} {log}")
             return
+        self._queued_item = None
+        self._on_track_started(item, index)
+        try:
+            self.player.set_normalizer(getattr(self, "_normalize_volume", False))
+        except Exception:
+            pass
+
+    def _on_track_started(self, item: SearchResult, index: Optional[int]) -> None:
+        """Actualiza estado y UI para la pista que empezo a sonar."""
+        self._remember_tempo()
         self._current = item
+        self._load_stored_tempo(item)
         self._current_index = index
         self._select_table_row(index)
         self._is_playing = True
-        if self._visualizer_timer:
-            self._visualizer_timer.resume()
+        self._wake_scheduler()
         self._set_now_playing(item)
         self._set_status(f"Reproduciendo \"{item.title}\" - {item.artist}")
         self._update_play_button()
+        self._apply_track_loudness(item)
         self._load_cover(item)
         try:
-            self.player.set_normalizer(getattr(self, "_normalize_volume", False))
+            self._load_lyrics(item)
         except Exception:
             pass
+        self._update_cache_stats()
+        if self._auto_continue:
+            upcoming = self._next_item()
+            if upcoming:
+                self.stream_resolver.prefetch(upcoming[1].video_id)
+
+    def _apply_track_loudness(self, item: SearchResult) -> None:
+        """Volumen corregido si la pista ya tiene medicion; si no, mpv sigue con dynaudnorm."""
+        if not self.player.available:
+            return
+        gain = self.loudness.gain_for(item.video_id)
         try:
-            self._load_lyrics(item)
+            self.player.set_track_gain(gain)
         except Exception:
             pass
+        if gain is None:
+            self.loudness.analyze(item.video_id)
+
+    def _update_cache_stats(self) -> None:
+        """Resumen de las caches de audio y covers en la pestaña Opciones."""
+        try:
+            stats = self.audio_cache.stats()
+            covers = self.cover_cache.stats()
+            self.query_one("#cache-stats", Static).update(
+                f"Cache audio: {stats['size_bytes'] / 1e6:.0f}/{stats['max_bytes'] / 1e6:.0f} MB, "
+                f"aciertos {stats['hit_ratio']:.0%}, desalojos {stats['evictions']}\n"
+                f"Cache covers: {covers['size_bytes'] / 1e6:.1f}/{covers['max_bytes'] / 1e6:.0f} MB, "
+                f"aciertos {covers['hit_ratio']:.0%}"
+            )
+        except Exception:
+            pass
+
+    def _next_item(self) -> Optional[tuple[int, SearchResult]]:
+        if self._current_index is None:
+            return None
+        next_index = self._current_index + 1
+        if 0 <= next_index < len(self._last_results):
+            return (next_index, self._last_results[next_index])
+        return None
+
+    def _maybe_queue_next(self, pos: Optional[float], dur: Optional[float]) -> None:
+        """En modo gapless encola la siguiente fila en mpv cuando faltan pocos segundos."""
+        if not (self._gapless and self._auto_continue) or self._queued_item is not None:
+            return
+        if pos is None or not dur or dur - pos > self._gapless_lead:
+            return
+        upcoming = self._next_item()
+        if not upcoming or not upcoming[1].url:
+            return
+        try:
+            self.player.queue_next(upcoming[1].url, upcoming[1].video_id)
+        except Exception:
+            return
+        self._queued_item = upcoming[1]
+
+    def _cancel_queued(self) -> None:
+        if self._queued_item is None:
+            return
+        self._queued_item = None
+        self.player.clear_queue()
+
+    def _handle_track_advanced(self, video_id: str) -> None:
+        """Callback cuando mpv paso sola a la pista encolada (sin reiniciar el player)."""
+        item = self._queued_item
+        self._queued_item = None
+        if item is None or item.video_id != video_id:
+            return
+        # Por video_id: tras una busqueda nueva la fila es otro objeto (o ya no esta).
+        index = next((i for i, row in enumerate(self._last_results) if row.video_id == video_id), None)
+        self._on_track_started(item, index)
+        if index is None:
+            self._set_status(
+                f"Reproduciendo \"{item.title}\" (ya no esta en los resultados: se detiene la continuacion)."
+            )
+
+    async def _resolve_and_play(self, item: SearchResult, index: Optional[int]) -> None:
+        """Resuelve la URL en el pool de yt-dlp y reproduce; si falla, mpv usa su hook ytdl."""
+        task = asyncio.current_task()
+        try:
+            await asyncio.wait_for(self.stream_resolver.resolve_async(item.video_id), timeout=15)
+        except asyncio.CancelledError:
+            return
+        except asyncio.TimeoutError:
+            # Va por el hook ytdl; no volver a esperar a yt-dlp con este video por un rato.
+            self.stream_resolver.mark_failed(item.video_id)
+        except Exception:
+            pass
+        if self._resolve_task is task:
+            self._resolve_task = None
+        self._start_playback(item, index, resolve=False)
+
+    async def _start_playback_when_ready(self, item: SearchResult, index: Optional[int]) -> None:
+        task = asyncio.current_task()
+        try:
+            await asyncio.to_thread(self.player.wait_ready)
+        except asyncio.CancelledError:
+            return
+        if self._pending_play_task is not task:
+            return
+        self._pending_play_task = None
+        self._start_playback(item, index)
 
     def action_toggle_play(self) -> None:
         if isinstance(self.focused, Input):
@@ -152,16 +304,52 @@ class PlaybackMixin:
             self._set_status(f"Error al pausar/reanudar: {exc}")
             return
         self._is_playing = is_playing
+        self._wake_scheduler()
         if self._is_playing:
-            if self._visualizer_timer:
-                self._visualizer_timer.resume()
             self._set_status(f"Reproduciendo \"{self._current.title}\".")
         else:
-            if self._visualizer_timer:
-                self._visualizer_timer.pause()
             self._set_status("Pausa.")
         self._update_play_button()
 
+    def _wake_scheduler(self) -> None:
+        """Recalcula el ritmo de refresco tras un cambio de estado (play/pausa, pestaña, foco)."""
+        if self._refresh_timer is not None:
+            self._refresh_timer.stop()
+            self._refresh_timer = None
+        interval = self._visualizer_refresh_interval()
+        if self.visualizer:
+            self.visualizer.analysis_rate = 1.0 / interval if interval else 0.0
+        self._run_scheduler()
+
+    def _run_scheduler(self) -> None:
+        self._refresh_timer = None
+        delay = self.scheduler.tick()
+        # Sin jobs activos no queda ningun timer armado.
+        if delay is not None:
+            self._refresh_timer = self.set_timer(max(0.02, delay), self._run_scheduler)
+
+    def _active_tab(self) -> str:
+        try:
+            return self.query_one("#right-tabs", TabbedContent).active
+        except Exception:
+            return ""
+
+    def _visualizer_refresh_interval(self) -> Optional[float]:
+        """Rapido con la pestaña Player visible y sonando; apagado en pausa, oculto o sin foco."""
+        if not self._is_playing or not self._current or not self._app_focused:
+            return None
+        if self._active_tab() != "player-tab":
+            return None
+        return self._visualizer_interval
+
+    def _progress_refresh_interval(self) -> Optional[float]:
+        """El progreso sigue en segundo plano (gapless, letras) pero lento si no se ve."""
+        if not self._is_playing or not self._current:
+            return None
+        if self._app_focused and self._active_tab() in ("player-tab", "lyrics-tab"):
+            return self._progress_interval
+        return self._background_interval
+
     def _set_now_playing(self, item: SearchResult) -> None:
         text = f"Titulo: {item.title}\nArtista: {item.artist}\nAlbum: {item.album}\nDuracion: {item.duration}"
         self.query_one("#now-playing", Static).update(text)
@@ -175,11 +363,12 @@ class PlaybackMixin:
                 self.player._player.stop()  # type: ignore[attr-defined]
         except Exception:
             pass
+        self._remember_tempo()
         self._is_playing = False
         self._current = None
         self._current_index = None
-        if self._visualizer_timer:
-            self._visualizer_timer.pause()
+        self._queued_item = None
+        self._wake_scheduler()
         self._set_status("Stop.")
         self._set_now_playing(SearchResult("Sin titulo", "-", "-", "-", "", ""))
         self._update_play_button()
@@ -196,25 +385,92 @@ class PlaybackMixin:
         if not self._is_playing or not self._current:
             self._reset_visualizer()
             return
-        energy = self.visualizer.get_energy() if self.visualizer else 0.0
-        if energy <= 0.0:
-            if self.player.available:
+        visualizer = self.visualizer
+        if visualizer and visualizer.is_real:
+            # Vista directa de la historia que escribe el hilo de captura: sin copiar ni
+            # acumular un segundo historial al ritmo de la UI.
+            history = visualizer.history
+            at = history.written
+            data = history.view(min(self._spark_width, at - self._spark_start), at=at)
+        else:
+            energy = visualizer.get_energy() if visualizer else 0.0
+            if energy <= 0.0 and self.player.available:
                 try:
                     energy = self.player.sample_energy()
                 except Exception:
                     energy = 0.0
-            else:
-                energy = 0.0
-        value = max(0.0, min(1.0, energy))
-        self._spark_data.append(value)
-        self._spark_data = self._spark_data[-80:]
-        spark.data = list(self._spark_data)
+            self._spark_data.push(max(0.0, min(1.0, energy)))
+            data = self._spark_data.view(self._spark_width)
+        # memoryview sobre la vista del ring: sin copiar el historial en cada tick.
+        spark.data = memoryview(data)
+        self._update_beat(spark)
+        self._update_spectrum()
+
+    def _update_beat(self, spark: Sparkline) -> None:
+        """Pulso del borde en cada beat nuevo y BPM (estimado o guardado) como titulo."""
+        if not self.visualizer:
+            return
+        beats = self.visualizer.beats
+        spark.set_class(beats.beat_count != self._beat_count, "-beat")
+        self._beat_count = beats.beat_count
+        bpm = beats.bpm if beats.confidence >= 0.3 else self._stored_bpm
+        spark.border_title = f"{bpm:.0f} BPM" if bpm else ""
+
+    def _remember_tempo(self) -> None:
+        """Guarda el BPM de la pista que termina y reinicia el tracker para la proxima.
+
+        La escritura en SQLite va a un hilo; no hace falta esperarla.
+        """
+        if not self.visualizer:
+            return
+        beats = self.visualizer.beats
+        if self._current and beats.bpm and beats.confidence >= 0.3:
+            value = {"bpm": beats.bpm, "confidence": round(beats.confidence, 2)}
+            asyncio.get_running_loop().run_in_executor(
+                None, partial(self.tempo_store.set, self._current.video_id, value)
+            )
+        beats.reset()
+        self._stored_bpm = None
+
+    def _load_stored_tempo(self, item: SearchResult) -> None:
+        """BPM guardado de la pista, leido en un hilo; se muestra mientras no haya estimacion."""
+        if self._tempo_task:
+            self._tempo_task.cancel()
+        self._tempo_task = asyncio.create_task(self._load_stored_tempo_async(item))
+
+    async def _load_stored_tempo_async(self, item: SearchResult) -> None:
+        task = asyncio.current_task()
+        try:
+            entry = await asyncio.to_thread(self.tempo_store.get, item.video_id)
+        except asyncio.CancelledError:
+            return
+        except Exception:  # noqa: BLE001
+            entry = None
+        if self._tempo_task is task:
+            self._tempo_task = None
+        if self._current is item and entry and isinstance(entry.value, dict):
+            self._stored_bpm = entry.value.get("bpm")
+
+    def _update_spectrum(self) -> None:
+        """Barras por banda cuando la fuente del visualizador entrega espectro."""
+        bands = self.visualizer.get_bands() if self.visualizer else None
+        try:
+            widget = self.query_one("#spectrum", Static)
+        except Exception:
+            return
+        widget.display = bands is not None
+        if bands is not None:
+            widget.show_bands(*bands)  # type: ignore[attr-defined]
 
     def _reset_visualizer(self) -> None:
         try:
             spark = self.query_one("#visualizer", Sparkline)
-            self._spark_data = []
+            self._spark_data.clear()
+            self._spark_start = self.visualizer.history.written if self.visualizer else 0
             spark.data = []
+            spark.border_title = ""
+            spark.remove_class("-beat")
+            self.query_one("#spectrum", Static).update("")
         except Exception:
             pass
 
@@ -267,6 +523,7 @@ class PlaybackMixin:
                 self._update_synced_highlight(pos)
             except Exception:
                 pass
+        self._maybe_queue_next(pos, dur)
 
     def _reset_progress(self) -> None:
         try:
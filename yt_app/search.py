@@ -1,5 +1,5 @@
 import asyncio
-from typing import List
+from typing import AsyncIterator, List, Optional
 
 from textual.widgets import DataTable, Input
 
@@ -11,6 +11,8 @@ class SearchMixin:
 
     _current_worker: asyncio.Task | None
     _last_results: List[SearchResult]
+    _search_limit: int
+    _current: Optional[SearchResult]
 
     def action_focus_input(self) -> None:
         self.query_one(Input).focus()
@@ -24,6 +26,8 @@ class SearchMixin:
         self._set_status(f"Buscando \"{query}\" en YouTube Music...")
         table = self.query_one(DataTable)
         table.clear()
+        # Las covers de la busqueda anterior ya no interesan.
+        self._cancel_cover_prefetch()
         self._last_results = []
 
         if self._current_worker:
@@ -34,8 +38,12 @@ class SearchMixin:
     async def _run_search(self, query: str) -> None:
         task = asyncio.current_task()
         try:
-            results = await asyncio.to_thread(self._fetch_results, query)
-            self._render_results(results, query)
+            async for batch in self._fetch_results(query):
+                self._append_results(batch)
+                if not self._current:
+                    count = len(self._last_results)
+                    self._set_status(f"{count} resultados para \"{query}\", cargando mas...")
+            self._finish_results(query)
         except asyncio.CancelledError:
             return
         except Exception as exc:  # noqa: BLE001
@@ -44,21 +52,28 @@ class SearchMixin:
             if self._current_worker is task:
                 self._current_worker = None
 
-    def _fetch_results(self, query: str) -> List[SearchResult]:
-        return self.ytmusic.search_songs(query, limit=20)
+    def _fetch_results(self, query: str) -> AsyncIterator[List[SearchResult]]:
+        return self.ytmusic_async.iter_search_songs(query, limit=self._search_limit)
 
-    def _render_results(self, results: List[SearchResult], query: str) -> None:
+    def _append_results(self, results: List[SearchResult]) -> None:
+        """Agrega una tanda de filas; la primera ya queda seleccionada y reproducible."""
         table = self.query_one(DataTable)
-        self._last_results = results
+        first_batch = not self._last_results
+        self._last_results.extend(results)
         for row in results:
             table.add_row(row.title, row.artist, row.album, row.duration)
-        if results:
-            self._set_status(f"{len(results)} resultados para \"{query}\".")
+        if first_batch and results:
             table.focus()
             try:
                 table.move_cursor(row=0, column=0, scroll=False)
             except Exception:
                 pass
+        self._schedule_cover_prefetch()
+
+    def _finish_results(self, query: str) -> None:
+        if self._last_results:
+            cached = " (cache)" if self.ytmusic_async.last_search_cached else ""
+            self._set_status(f"{len(self._last_results)} resultados para \"{query}\"{cached}.")
         else:
             self._set_status(f"Sin resultados para \"{query}\".")
 